@@ -1,15 +1,26 @@
 from fastapi import Request, Form, UploadFile, File
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 
-from bson import ObjectId
 import io  # kept if you later re-enable posters
 
 from database import get_database
+from repository import get_movie_repository
+from cache import cache_stats
+from page_cache import page_cache
+from signed_tokens import seen_nonces
+from singleflight import singleflight_stats
+from catalog_sync import catalog_sync
+from startup_timer import startup_timer
+from token_pool import token_pool
+from verification import shortlink_client
+from verification_checker import quota_cache
+from view_counter import view_counter
 from config import ADMIN_USERNAME, ADMIN_PASSWORD
 
 templates = Jinja2Templates(directory="templates")
 db = get_database()
+movies_repo = get_movie_repository()
 
 # ============================================
 # ADMIN LOGIN
@@ -53,7 +64,7 @@ async def admin_dashboard(request: Request):
     if not request.session.get("admin"):
         return RedirectResponse("/admin")
 
-    total_movies = await db.movies.count_documents({})
+    total_movies = await movies_repo.count()
 
     return templates.TemplateResponse(
         "admin_dashboard.html",
@@ -68,7 +79,7 @@ async def admin_movies_page(request: Request):
     if not request.session.get("admin"):
         return RedirectResponse("/admin")
 
-    movies = await db.movies.find().sort("created_at", -1).to_list(length=200)
+    movies = await movies_repo.list_recent(limit=200)
 
     return templates.TemplateResponse(
         "admin_movies.html",
@@ -116,12 +127,12 @@ async def admin_add_movie_post(
             "quality": quality.strip(),
             "genres": [g.strip() for g in genres.split(",") if g.strip()],
             "description": description.strip(),
-            "lulu_link": lulu_link.strip(),
-            "ht_link": ht_link.strip(),
+            "watch_link": lulu_link.strip(),
+            "download_link": ht_link.strip(),
             "poster_file_id": poster_file_id,
         }
 
-        await db.movies.insert_one(movie_doc)
+        await movies_repo.insert(movie_doc)
 
         return RedirectResponse("/admin/movies", status_code=302)
 
@@ -152,9 +163,34 @@ async def admin_delete_movie(request: Request, movie_id: str):
         return RedirectResponse("/admin")
 
     try:
-        await db.movies.delete_one({"_id": ObjectId(movie_id)})
+        await movies_repo.delete(movie_id)
     except Exception:
         pass
 
     return RedirectResponse("/admin/movies", status_code=302)
     
+
+
+# ============================================
+# CACHE STATS (JSON)
+# ============================================
+
+async def admin_cache_stats(request: Request):
+    if not request.session.get("admin"):
+        return RedirectResponse("/admin")
+
+    return JSONResponse(
+        {
+            **cache_stats(),
+            "page_routes": page_cache.stats(),
+            "view_counter": view_counter.stats(),
+            "singleflight": singleflight_stats(),
+            "catalog_sync": catalog_sync.stats(),
+            "startup": startup_timer.stats(),
+            # "quota" (from cache_stats) is the entry cache itself
+            "quota_checks": quota_cache.stats(),
+            "shortlink": shortlink_client.stats(),
+            "token_pool": token_pool.stats(),
+            "signed_nonces": seen_nonces.stats(),
+        }
+    )
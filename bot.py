@@ -0,0 +1,274 @@
+# bot.py
+
+"""
+Telegram bot (Pyrogram client and handlers).
+
+Run on its own with APP_ROLE=bot:
+
+    python bot.py
+
+so the website can run as many uvicorn workers as there are cores
+(APP_ROLE=web) while exactly one process holds the bot session. With
+APP_ROLE=all (the default) main.py starts this same client inside the
+web process.
+"""
+
+from startup_timer import startup_timer
+
+import asyncio
+import logging
+from datetime import datetime
+
+from pyrogram import Client, filters, idle
+from pyrogram.errors import Unauthorized
+from pyrogram.storage import MemoryStorage
+from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+
+from config import (
+    BOT_TOKEN,
+    BOT_SESSION_STORE,
+    API_ID,
+    API_HASH,
+    REQUEST_GROUP,
+    BASE_URL,
+    VERIFICATION_TUTORIAL_LINK,
+    VERIFICATION_TUTORIAL_NAME,
+)
+from database import get_database
+from repository import get_movie_repository
+from services import (
+    start_core_services,
+    stop_core_services,
+    core_warm_up_steps,
+    warm_up,
+)
+from token_pool import token_pool
+from verification_checker import check_user_access
+
+logger = logging.getLogger(__name__)
+
+db = get_database()
+movies_repo = get_movie_repository()
+
+# ============================================
+# PYROGRAM BOT (SINGLE CLIENT)
+# ============================================
+
+bot = Client(
+    "moviebot",
+    api_id=API_ID,
+    api_hash=API_HASH,
+    bot_token=BOT_TOKEN,
+    # "file" keeps ./moviebot.session; "mongo" restores a session string (start_bot)
+    in_memory=BOT_SESSION_STORE != "file",
+)
+
+logger.info("✅ Pyrogram bot client created")
+
+
+# ============================================
+# SESSION PERSISTENCE
+# ============================================
+
+# Sessions belong to one bot; a new BOT_TOKEN must not reuse the old one
+_BOT_ID = (BOT_TOKEN or "").split(":")[0]
+
+
+async def _restore_session():
+    """Load the stored session string into the client. True if one was found."""
+    doc = await db.bot_sessions.find_one({"_id": bot.name})
+    if not doc or doc.get("bot_id") != _BOT_ID or not doc.get("session_string"):
+        return False
+    bot.storage = MemoryStorage(bot.name, doc["session_string"])
+    return True
+
+
+async def _save_session():
+    await db.bot_sessions.update_one(
+        {"_id": bot.name},
+        {
+            "$set": {
+                "bot_id": _BOT_ID,
+                "session_string": await bot.export_session_string(),
+                "updated_at": datetime.utcnow(),
+            }
+        },
+        upsert=True,
+    )
+
+
+async def start_bot():
+    """
+    Connect the bot. With BOT_SESSION_STORE=mongo the previous session is
+    reused, so a restart skips Telegram's bot-token authorization.
+    """
+    restored = BOT_SESSION_STORE == "mongo" and await _restore_session()
+    with startup_timer.phase("bot"):
+        try:
+            await bot.start()
+        except Unauthorized as e:
+            if not restored:
+                raise
+            # Revoked / expired stored session: authorize from scratch
+            logger.warning(f"⚠️ Stored bot session rejected ({e}), re-authorizing")
+            await db.bot_sessions.delete_one({"_id": bot.name})
+            bot.storage = MemoryStorage(bot.name)
+            restored = False
+            await bot.start()
+
+    if BOT_SESSION_STORE == "mongo" and not restored:
+        await _save_session()
+    logger.info(f"✅ Bot started ({'restored session' if restored else 'new session'})")
+
+# ============================================
+# TELEGRAM BOT HANDLERS
+# ============================================
+
+
+@bot.on_message(filters.command("start") & filters.private)
+async def start_command(client, message):
+    user_id = message.from_user.id
+    username = message.from_user.username or message.from_user.first_name
+
+    await db.users.update_one(
+        {"user_id": user_id},
+        {
+            "$set": {
+                "username": username,
+                "user_id": user_id,
+            },
+            "$setOnInsert": {"joined_at": message.date},
+        },
+        upsert=True,
+    )
+
+    text = (
+        "🎬 **Welcome to Movie Magic Club!**\n\n"
+        f"Hi {username}! 👋\n\n"
+        "🔍 Type a movie name to search.\n"
+        "🌐 Or open the website to browse.\n"
+    )
+
+    buttons = InlineKeyboardMarkup(
+        [
+            [InlineKeyboardButton("🌐 Browse Website", url=BASE_URL)],
+            [InlineKeyboardButton("👥 Join Group", url=REQUEST_GROUP)],
+        ]
+    )
+
+    await message.reply_text(text, reply_markup=buttons)
+
+
+@bot.on_message(filters.text & filters.private & ~filters.command(["start"]))
+async def search_movie(client, message):
+    user_id = message.from_user.id
+    query = message.text.strip()
+
+    # ===== Verification limit =====
+    access = await check_user_access(user_id, db)
+    if not access["allowed"] and access.get("need_verification"):
+        shortlink_url = await token_pool.issue(user_id, db)
+
+        buttons = InlineKeyboardMarkup(
+            [
+                [InlineKeyboardButton("✅ Verify", url=shortlink_url)],
+                [
+                    InlineKeyboardButton(
+                        VERIFICATION_TUTORIAL_NAME,
+                        url=VERIFICATION_TUTORIAL_LINK,
+                    )
+                ],
+            ]
+        )
+
+        await message.reply_text(
+            "You reached today's free limit.\n"
+            "Complete this one-time verification to unlock movies.",
+            reply_markup=buttons,
+        )
+        return
+
+    # ===== Movie search =====
+    movies = await movies_repo.search_movies(query, limit=10)
+
+    if not movies:
+        await message.reply_text(
+            "😕 Movie not found in database.\n"
+            "You can request it in our group."
+        )
+        return
+
+    for movie in movies:
+        try:
+            title = movie.title or "Unknown"
+            year = movie.year or "N/A"
+            language = movie.language or "N/A"
+            genres = ", ".join(movie.genres)
+            quality = movie.quality or "N/A"
+            description = movie.description or "No description"
+            views = movie.views
+
+            caption = (
+                f"🎬 **{title}** ({year})\n\n"
+                f"🗣️ Language: {language}\n"
+                f"🎭 Genre: {genres}\n"
+                f"📺 Quality: {quality}\n"
+                f"👁 Views: {views}\n\n"
+                f"📝 {description}\n"
+            )
+
+            movie_url = f"{BASE_URL}/movie/{movie.id}"
+
+            link_row = []
+            if movie.watch_link:
+                link_row.append(InlineKeyboardButton("▶️ Watch", url=movie.watch_link))
+            if movie.download_link:
+                link_row.append(InlineKeyboardButton("⬇️ Download", url=movie.download_link))
+
+            buttons = InlineKeyboardMarkup(
+                [row for row in (
+                    link_row,
+                    [InlineKeyboardButton("🌐 View on Website", url=movie_url)],
+                ) if row]
+            )
+
+            poster_file_id = movie.poster_file_id
+            if poster_file_id:
+                await message.reply_photo(
+                    photo=poster_file_id,
+                    caption=caption,
+                    reply_markup=buttons,
+                )
+            else:
+                await message.reply_text(caption, reply_markup=buttons)
+
+            movies_repo.increment_views(movie.id)
+
+        except Exception as e:
+            logger.error(f"Error sending movie: {e}")
+            continue
+
+
+# ============================================
+# STANDALONE RUN (APP_ROLE=bot)
+# ============================================
+
+
+async def run_bot():
+    """Serve the bot until SIGINT/SIGTERM, with the services searches need."""
+    startup_timer.since_start("imports")
+    background_tasks = []
+    await start_core_services(db, background_tasks)
+    # Searches fall back to a regex scan until the index is built
+    background_tasks.append(asyncio.create_task(warm_up(core_warm_up_steps(db))))
+    await start_bot()
+    try:
+        await idle()
+    finally:
+        await bot.stop()
+        await stop_core_services(db, background_tasks)
+        logger.info("🛑 Bot stopped")
+
+
+if __name__ == "__main__":
+    bot.run(run_bot())
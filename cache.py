@@ -0,0 +1,148 @@
+# cache.py
+
+"""
+Small in-process caches shared by the bot and the website.
+
+Usage:
+
+    from cache import query_cache
+
+    movies = query_cache.get(key)
+    if movies is None:
+        movies = await ...
+        query_cache.set(key, movies)
+
+    # or read-through, with concurrent misses for one key sharing one load
+    movie = await movie_cache.get_or_load(movie_id, load_movie)
+"""
+
+import time
+from collections import OrderedDict
+
+from catalog import on_catalog_change
+from config import (
+    QUERY_CACHE_SIZE,
+    QUERY_CACHE_TTL,
+    MOVIE_CACHE_SIZE,
+    MOVIE_CACHE_TTL,
+)
+from singleflight import SingleFlight
+
+_MISSING = object()
+
+# Every cache registers itself here so stats can be reported in one place
+_caches = {}
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache whose entries also expire after `ttl` seconds.
+    get_or_load() coalesces concurrent misses through a SingleFlight
+    group of the same name. Not thread-safe; meant for a single asyncio
+    event loop.
+    """
+
+    def __init__(self, name, maxsize=1024, ttl=300):
+        self.name = name
+        self.maxsize = int(maxsize)
+        self.ttl = float(ttl)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._flight = SingleFlight(name)
+        self._generation = 0  # bumped by pop/clear so in-flight loads don't resurrect entries
+        _caches[name] = self
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key, default=None):
+        self._generation += 1
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        self._generation += 1
+        self._data.clear()
+
+    async def get_or_load(self, key, loader, ttl=None):
+        """
+        Return the cached value, or await loader() and cache its result.
+        While a load for `key` is running, other callers wait for it
+        instead of starting their own.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        async def load():
+            generation = self._generation
+            value = await loader()
+            if generation == self._generation:
+                self.set(key, value, ttl)
+            return value
+
+        return await self._flight.do(key, load)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def cache_stats():
+    """Stats for every registered cache, keyed by cache name."""
+    return {name: c.stats() for name, c in _caches.items()}
+
+
+# Search / browse results, keyed on ("search", query, ...) or (field, value, ...)
+query_cache = TTLCache("query", maxsize=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL)
+
+# Movie detail documents by _id (detail page, watch/download redirects)
+movie_cache = TTLCache("movies_by_id", maxsize=MOVIE_CACHE_SIZE, ttl=MOVIE_CACHE_TTL)
+
+
+@on_catalog_change
+def _drop_query_results(op, movie):
+    # Any insert/delete can change any result list; they are cheap to rebuild
+    query_cache.clear()
+    if op == "reset":
+        movie_cache.clear()
+    else:
+        movie_cache.pop(movie["_id"])
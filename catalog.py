@@ -0,0 +1,62 @@
+# catalog.py
+
+"""
+Catalog change notifications.
+
+Anything that writes to db.movies calls `catalog_changed(...)`; in-memory
+structures (search index, result caches, ...) register a listener with
+`on_catalog_change` and update or drop their state.
+
+    from catalog import catalog_changed
+
+    await db.movies.insert_one(movie_doc)
+    catalog_changed("insert", movie_doc)
+
+Writes made by other worker processes arrive through catalog_sync.py,
+which calls catalog_changed() for them in this process.
+"""
+
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+_listeners = []
+
+# Bumped on every change; cheap way to tell whether derived data is stale
+catalog_version = 0
+catalog_changed_at = time.time()
+
+
+def on_catalog_change(callback):
+    """
+    Register callback(op, movie) to run after every catalog write.
+    `op` is "insert" (also used for an updated document) or "delete";
+    `movie` is the document (or {"_id": id}). "reset" means anything may
+    have changed (movie is {}): drop derived state.
+    Can be used as a decorator.
+    """
+    _listeners.append(callback)
+    return callback
+
+
+def get_catalog_version():
+    return catalog_version
+
+
+def get_catalog_changed_at():
+    """Unix time of the last catalog change (process start if none yet)."""
+    return catalog_changed_at
+
+
+def catalog_changed(op, movie):
+    """Notify every listener that a movie was inserted or deleted."""
+    global catalog_version, catalog_changed_at
+    catalog_version += 1
+    catalog_changed_at = time.time()
+
+    for callback in _listeners:
+        try:
+            callback(op, movie)
+        except Exception as e:
+            logger.error(f"❌ Catalog listener {callback.__name__} failed: {e}")
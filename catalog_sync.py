@@ -0,0 +1,235 @@
+# catalog_sync.py
+
+"""
+Cross-worker catalog invalidation.
+
+catalog_changed() only reaches listeners in the process that did the
+write. With several uvicorn workers (or the bot in its own process) the
+others would keep serving deleted or outdated movies until their caches
+expire. CatalogSync replays every other process's writes into the local
+listeners:
+
+- changestream: a MongoDB change stream on db.movies (replica sets,
+  including a single-node one and Atlas).
+- poll: standalone servers have no change streams, so writers also bump
+  a version document in db.meta ({"_id": "catalog"}) carrying a short
+  log of recent changes, and every worker polls it.
+
+Writers call `await catalog_sync.publish(db, op, movie_id)` after
+catalog_changed(); MovieRepository does this for every insert/delete.
+If a worker falls too far behind to replay (change log overrun, change
+stream history lost) it runs the full `resync` callback instead.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from catalog import catalog_changed
+
+logger = logging.getLogger(__name__)
+
+# Identifies this process in the polled change log
+ORIGIN = f"{socket.gethostname()}:{os.getpid()}"
+
+# Entries kept in db.meta; a worker more than this many changes behind resyncs
+CHANGE_LOG_SIZE = 200
+
+# How long a local write waits for its own change-stream event
+_ECHO_SECONDS = 60
+
+# "$changeStream stage is only supported on replica sets"
+_NOT_REPLICA_SET = 40573
+_HISTORY_LOST = 286
+
+_STREAM_PIPELINE = [
+    {
+        "$match": {
+            "$or": [
+                {"operationType": {"$in": ["insert", "delete", "replace"]}},
+                # Batched view-count flushes touch every hot movie; they don't change what we cache
+                {
+                    "operationType": "update",
+                    "updateDescription.updatedFields.views": {"$exists": False},
+                },
+                # Sent after a drop/rename; the stream can't be resumed past it
+                {"operationType": "invalidate"},
+            ]
+        }
+    }
+]
+
+
+class CatalogSync:
+    """Applies catalog changes made by other processes to local listeners."""
+
+    def __init__(self):
+        self.mode = None
+        self.seen_version = 0
+        self.applied = 0
+        self.echoes_skipped = 0
+        self.resyncs = 0
+        self._echoes = {}  # (op, movie_id) -> expires_at, for our own stream events
+        self._resync = None
+
+    # ---------- writers ----------
+
+    async def publish(self, db, op, movie_id):
+        """Record a local write for the other workers (call after catalog_changed)."""
+        self._forget_old_echoes()
+        self._echoes[(op, movie_id)] = time.monotonic() + _ECHO_SECONDS
+        entry = {"op": op, "id": movie_id, "origin": ORIGIN}
+        try:
+            await db.meta.update_one(
+                {"_id": "catalog"},
+                [
+                    {"$set": {"version": {"$add": [{"$ifNull": ["$version", 0]}, 1]}}},
+                    {
+                        "$set": {
+                            "changes": {
+                                "$slice": [
+                                    {
+                                        "$concatArrays": [
+                                            {"$ifNull": ["$changes", []]},
+                                            [{**entry, "v": "$version"}],
+                                        ]
+                                    },
+                                    -CHANGE_LOG_SIZE,
+                                ]
+                            }
+                        }
+                    },
+                ],
+                upsert=True,
+            )
+        except PyMongoError as e:
+            # The write itself succeeded; other workers catch up on their cache TTLs
+            logger.error(f"❌ Could not publish catalog change {op} {movie_id}: {e}")
+
+    def _forget_old_echoes(self):
+        now = time.monotonic()
+        for key in [k for k, expires_at in self._echoes.items() if expires_at <= now]:
+            del self._echoes[key]
+
+    def _is_echo(self, op, movie_id):
+        return self._echoes.pop((op, movie_id), None) is not None
+
+    # ---------- readers ----------
+
+    async def _apply(self, db, op, movie_id, doc=None):
+        if op == "insert" and doc is None:
+            doc = await db.movies.find_one({"_id": movie_id})
+            if doc is None:
+                return  # already deleted again; that delete is on its way
+        catalog_changed(op, doc or {"_id": movie_id})
+        self.applied += 1
+
+    async def _full_resync(self, reason):
+        logger.warning(f"⚠️ Catalog resync ({reason})")
+        self.resyncs += 1
+        if self._resync is not None:
+            await self._resync()
+
+    async def watch_changes(self, db):
+        """Follow db.movies with a change stream, resuming after errors."""
+        resume_token = None
+        while True:
+            try:
+                async with db.movies.watch(
+                    _STREAM_PIPELINE,
+                    full_document="updateLookup",
+                    resume_after=resume_token,
+                ) as stream:
+                    if resume_token is None and self.mode == "changestream":
+                        # Reopened without a token: changes in the gap are unknown
+                        await self._full_resync("change stream reopened")
+                    self.mode = "changestream"
+                    async for change in stream:
+                        if change["operationType"] == "invalidate":
+                            resume_token = None
+                            break
+                        resume_token = stream.resume_token
+                        await self._on_stream_event(db, change)
+            except OperationFailure as e:
+                if e.code == _NOT_REPLICA_SET:
+                    raise
+                if e.code == _HISTORY_LOST:
+                    resume_token = None
+                logger.error(f"❌ Catalog change stream failed: {e}")
+                await asyncio.sleep(5)
+            except PyMongoError as e:
+                logger.error(f"❌ Catalog change stream failed: {e}")
+                await asyncio.sleep(5)
+
+    async def _on_stream_event(self, db, change):
+        movie_id = change["documentKey"]["_id"]
+        # Listeners know insert/delete; an update or replace re-inserts the new version
+        op = "delete" if change["operationType"] == "delete" else "insert"
+        if self._is_echo(op, movie_id):
+            self.echoes_skipped += 1
+            return
+
+        doc = change.get("fullDocument")
+        if op == "insert" and doc is None:
+            op = "delete"  # updated, then deleted before the lookup
+        await self._apply(db, op, movie_id, doc)
+
+    async def poll_changes(self, db, interval):
+        """Replay the change log in db.meta every `interval` seconds."""
+        self.mode = "poll"
+        self.seen_version = None
+
+        while True:
+            try:
+                if self.seen_version is None:
+                    doc = await db.meta.find_one({"_id": "catalog"}) or {}
+                    self.seen_version = doc.get("version", 0)
+                await asyncio.sleep(interval)
+                doc = await db.meta.find_one({"_id": "catalog"}) or {}
+                version = doc.get("version", 0)
+                if version == self.seen_version:
+                    continue
+
+                pending = [c for c in doc.get("changes", []) if c["v"] > self.seen_version]
+                if version < self.seen_version or not pending or pending[0]["v"] != self.seen_version + 1:
+                    await self._full_resync(f"change log at v{version}, we saw v{self.seen_version}")
+                else:
+                    for change in pending:
+                        if change.get("origin") != ORIGIN:
+                            await self._apply(db, change["op"], change["id"])
+                self.seen_version = version
+            except Exception as e:
+                logger.error(f"❌ Catalog poll failed: {e}")
+
+    async def run(self, db, mode="auto", interval=2, resync=None):
+        """
+        Follow other workers' changes until cancelled.
+        mode: "auto" (change stream, else poll), "changestream" or "poll".
+        """
+        self._resync = resync
+        if mode in ("auto", "changestream"):
+            try:
+                await self.watch_changes(db)
+            except OperationFailure as e:
+                if mode == "changestream":
+                    logger.error(f"❌ CATALOG_SYNC_MODE=changestream but the server has none: {e}")
+                    return
+                logger.info(f"ℹ️ No change streams on this server ({e.code}), polling db.meta")
+        await self.poll_changes(db, interval)
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "origin": ORIGIN,
+            "seen_version": self.seen_version,
+            "applied": self.applied,
+            "echoes_skipped": self.echoes_skipped,
+            "resyncs": self.resyncs,
+        }
+
+
+catalog_sync = CatalogSync()
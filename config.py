@@ -1,8 +1,15 @@
 import os
+import logging
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+logger = logging.getLogger(__name__)
+
 # =========================
 # BOT / TELEGRAM CONFIG
 # =========================
@@ -14,6 +21,13 @@ API_HASH = os.getenv("API_HASH")
 # Webhook URL (leave empty if using polling / FAST MODE)
 WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
 
+# Bot API calls from utils/helpers share one keep-alive session:
+# max open connections, per-request timeout (seconds) and attempts per
+# call (timeouts, connection errors, 429 and 5xx are retried)
+TELEGRAM_API_CONNECTIONS = int(os.getenv("TELEGRAM_API_CONNECTIONS", "20"))
+TELEGRAM_API_TIMEOUT = float(os.getenv("TELEGRAM_API_TIMEOUT", "30"))
+TELEGRAM_API_ATTEMPTS = int(os.getenv("TELEGRAM_API_ATTEMPTS", "4"))
+
 # List of admin user IDs (comma-separated in .env)
 # Example in Koyeb: 123456789,987654321
 ADMIN_IDS = [int(id.strip()) for id in os.getenv("ADMIN_IDS").split(",")]
@@ -24,6 +38,10 @@ ADMIN_IDS = [int(id.strip()) for id in os.getenv("ADMIN_IDS").split(",")]
 
 MONGO_URI = os.getenv("MONGO_URI")
 
+# Refuse to start if a hot query would run without an index
+# (otherwise missing indexes are only logged and built in the background)
+INDEX_STRICT = os.getenv("INDEX_STRICT", "false").lower() == "true"
+
 # =========================
 # ADMIN DASHBOARD LOGIN
 # =========================
@@ -42,6 +60,15 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-12345-change-this")
 SHORTLINK_URL = os.getenv("SHORTLINK_URL", "https://yourshortlinkservice.com")
 SHORTLINK_API = os.getenv("SHORTLINK_API", "your_api_key_here")
 
+# Give up on the provider after this many seconds per shortlink (all
+# formats together) / per API format tried
+SHORTLINK_DEADLINE = float(os.getenv("SHORTLINK_DEADLINE", "6"))
+SHORTLINK_ATTEMPT_TIMEOUT = float(os.getenv("SHORTLINK_ATTEMPT_TIMEOUT", "3"))
+# After this many failed shortlinks in a row, send direct verification
+# links for SHORTLINK_BREAKER_COOLDOWN seconds before trying again
+SHORTLINK_BREAKER_FAILURES = int(os.getenv("SHORTLINK_BREAKER_FAILURES", "3"))
+SHORTLINK_BREAKER_COOLDOWN = int(os.getenv("SHORTLINK_BREAKER_COOLDOWN", "60"))
+
 # How many free movies per user per day before verification is needed
 VERIFICATION_FREE_LIMIT = int(os.getenv("VERIFICATION_FREE_LIMIT", "3"))
 
@@ -65,6 +92,27 @@ VERIFICATION_TUTORIAL_NAME = os.getenv(
 # Enable/disable verification system globally (set "false" to turn off)
 VERIFICATION_ON = os.getenv("VERIFICATION_ON", "true").lower() == "true"
 
+# "db": one verif_tokens row per verification link (default)
+# "signed": the link carries a SECRET_KEY-signed user id + expiry, checked
+# without MongoDB (no token pool in this mode)
+VERIFICATION_TOKEN_MODE = os.getenv("VERIFICATION_TOKEN_MODE", "db").lower()
+# Used signed links remembered per process (replay protection)
+VERIFICATION_NONCE_CACHE_SIZE = int(os.getenv("VERIFICATION_NONCE_CACHE_SIZE", "100000"))
+
+# Per-process quota cache in front of verif_users: users remembered, and
+# how often locally counted free views are written back (seconds)
+QUOTA_CACHE_SIZE = int(os.getenv("QUOTA_CACHE_SIZE", "50000"))
+QUOTA_FLUSH_SECONDS = int(os.getenv("QUOTA_FLUSH_SECONDS", "5"))
+
+# Pool of ready verification tokens (shortlink already created): refilled
+# up to TOKEN_POOL_HIGH once fewer than TOKEN_POOL_LOW are left (HIGH=0: off)
+TOKEN_POOL_LOW = int(os.getenv("TOKEN_POOL_LOW", "20"))
+TOKEN_POOL_HIGH = int(os.getenv("TOKEN_POOL_HIGH", "100"))
+# Pooled tokens expiring sooner than this get a fresh expiry (minutes)
+TOKEN_POOL_MIN_TTL_MINUTES = int(os.getenv("TOKEN_POOL_MIN_TTL_MINUTES", "60"))
+# How often the pool is checked even if nobody took a token (seconds)
+TOKEN_POOL_REFILL_SECONDS = int(os.getenv("TOKEN_POOL_REFILL_SECONDS", "30"))
+
 # =========================
 # WEB / DEPLOYED URLS AND REQUEST GROUP
 # =========================
@@ -75,6 +123,76 @@ BASE_URL = os.getenv("BASE_URL", "https://your-app-url.koyeb.app")
 # Telegram group/channel for user requests
 REQUEST_GROUP = os.getenv("REQUEST_GROUP", "https://t.me/movies_magic_club3")
 
+# =========================
+# CACHING
+# =========================
+
+# Search / browse result cache (entries, seconds)
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "2000"))
+QUERY_CACHE_TTL = int(os.getenv("QUERY_CACHE_TTL", "300"))
+
+# Rendered HTML page cache (entries, seconds) and browser max-age (seconds)
+PAGE_CACHE_SIZE = int(os.getenv("PAGE_CACHE_SIZE", "500"))
+PAGE_CACHE_TTL = int(os.getenv("PAGE_CACHE_TTL", "600"))
+PAGE_CACHE_MAX_AGE = int(os.getenv("PAGE_CACHE_MAX_AGE", "30"))
+
+# Homepage snapshot rebuild interval (seconds) and optional sharing
+# through the homepage_snapshots collection when running several workers
+HOMEPAGE_REFRESH_SECONDS = int(os.getenv("HOMEPAGE_REFRESH_SECONDS", "60"))
+HOMEPAGE_SNAPSHOT_PERSIST = os.getenv("HOMEPAGE_SNAPSHOT_PERSIST", "false").lower() == "true"
+
+# Movie-by-id cache for detail / watch / download (entries, seconds)
+MOVIE_CACHE_SIZE = int(os.getenv("MOVIE_CACHE_SIZE", "5000"))
+MOVIE_CACHE_TTL = int(os.getenv("MOVIE_CACHE_TTL", "3600"))
+
+# How often autocomplete weights (views) are reloaded from MongoDB (seconds)
+SUGGEST_REFRESH_SECONDS = int(os.getenv("SUGGEST_REFRESH_SECONDS", "900"))
+
+# =========================
+# PROCESS ROLE
+# =========================
+
+# "all": website + Telegram bot in one process (single uvicorn worker)
+# "web": website only (scale with WEB_WORKERS / uvicorn --workers)
+# "bot": Telegram bot only (`python bot.py`)
+APP_ROLE = os.getenv("APP_ROLE", "all").lower()
+
+# Where the Telegram bot keeps its session between restarts:
+# "mongo" (db.bot_sessions - survives scale-to-zero), "file" (./moviebot.session)
+# or "memory" (re-authorize with the bot token on every start)
+BOT_SESSION_STORE = os.getenv("BOT_SESSION_STORE", "mongo").lower()
+
+# =========================
+# CROSS-WORKER INVALIDATION
+# =========================
+
+# "auto" (change streams when MongoDB is a replica set, else polling),
+# "changestream", "poll" or "off" (single process)
+CATALOG_SYNC_MODE = os.getenv("CATALOG_SYNC_MODE", "auto").lower()
+# Poll interval for standalone servers (seconds)
+CATALOG_POLL_SECONDS = float(os.getenv("CATALOG_POLL_SECONDS", "2"))
+
+# =========================
+# VIEW COUNTER
+# =========================
+
+# Buffered view increments are written every N seconds,
+# or earlier once this many distinct movies are pending
+VIEW_FLUSH_SECONDS = int(os.getenv("VIEW_FLUSH_SECONDS", "10"))
+VIEW_FLUSH_THRESHOLD = int(os.getenv("VIEW_FLUSH_THRESHOLD", "500"))
+
+# =========================
+# TRENDING
+# =========================
+
+# A view counts half as much after this many hours
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "24"))
+# Movies kept in the trending heap / hours of view buckets loaded
+TRENDING_TOP_N = int(os.getenv("TRENDING_TOP_N", "50"))
+TRENDING_WINDOW_HOURS = int(os.getenv("TRENDING_WINDOW_HOURS", "168"))
+# How often scores are reloaded from view_buckets (picks up other workers' views)
+TRENDING_RELOAD_SECONDS = int(os.getenv("TRENDING_RELOAD_SECONDS", "600"))
+
 # =========================
 # POSTER STORAGE CHANNEL
 # =========================
@@ -83,4 +201,4 @@ REQUEST_GROUP = os.getenv("REQUEST_GROUP", "https://t.me/movies_magic_club3")
 # Make sure POSTER_CHANNEL env in Koyeb is set to -1003366698966
 POSTER_CHANNEL = int(os.getenv("POSTER_CHANNEL", "-1003366698966"))
 
-print("✅ Config loaded")
+logger.info("✅ Config loaded")
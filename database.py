@@ -24,6 +24,8 @@ def get_database():
         db.users          # Telegram users
         db.verif_users    # daily limit + verified status
         db.verif_tokens   # shortlink verification tokens
+
+    Indexes are declared in indexes.py and built at app startup.
     """
     global _client, _db
 
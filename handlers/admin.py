@@ -1,8 +1,8 @@
 from utils.helpers import send_message, send_photo
 from config import ADMIN_IDS
-from database import get_database
+from repository import get_movie_repository
 
-db = get_database()
+movies_repo = get_movie_repository()
 
 # State storage for upload wizard
 upload_states = {}
@@ -34,7 +34,7 @@ async def cmd_cancel(msg, user_id, chat_id):
 
 async def cmd_listmovies(msg, user_id, chat_id):
     """List all movies"""
-    movies = await db.get_all_movies(limit=20)
+    movies = await movies_repo.get_all_movies(limit=20)
     
     if not movies:
         await send_message(chat_id, "📭 No movies yet!\n\nUse /addmovie to add your first movie.")
@@ -42,7 +42,7 @@ async def cmd_listmovies(msg, user_id, chat_id):
     
     text = "🎬 **Recent Movies**\n\n"
     for i, movie in enumerate(movies, 1):
-        text += f"{i}. **{movie['title']}** ({movie['year']}) - {movie.get('quality', 'HD')}\n"
+        text += f"{i}. **{movie.title}** ({movie.year}) - {movie.quality or 'HD'}\n"
     
     text += f"\n📊 Total: {len(movies)} movies"
     await send_message(chat_id, text)
@@ -111,14 +111,14 @@ async def handle_upload_steps(msg, user_id, chat_id):
                 "year": data["year"],
                 "genres": data["genres"],
                 "quality": data["quality"],
-                "lulu_stream_link": data["lulu_link"],
-                "htfilesharing_link": data["ht_link"],
+                "watch_link": data["lulu_link"],
+                "download_link": data["ht_link"],
                 "poster_file_id": data["poster_file_id"],
                 "description": data["description"],
                 "added_by": user_id
             }
             
-            movie_id = await db.add_movie(movie_doc)
+            movie_id = await movies_repo.add_movie(movie_doc)
             
             # Send confirmation
             caption = (
@@ -1,8 +1,8 @@
 from utils.helpers import send_message
 from config import ADMIN_IDS
-from database import get_database
+from repository import get_movie_repository
 
-db = get_database()
+movies_repo = get_movie_repository()
 
 async def cmd_start(msg, user_id, chat_id):
     """Handle /start command"""
@@ -29,7 +29,7 @@ async def cmd_start(msg, user_id, chat_id):
 
 async def cmd_test(msg, user_id, chat_id):
     """Handle /test command"""
-    total_movies = await db.movies.count_documents({})
+    total_movies = await movies_repo.count()
     text = (
         f"✅ **Test Results**\n\n"
         f"🤖 Bot: Online\n"
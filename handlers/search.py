@@ -1,7 +1,7 @@
 from utils.helpers import send_message, send_photo
-from database import get_database
+from repository import get_movie_repository
 
-db = get_database()
+movies_repo = get_movie_repository()
 
 async def search_movies(msg, user_id, chat_id, query):
     """Search movies by title - OPTIMIZED"""
@@ -9,7 +9,7 @@ async def search_movies(msg, user_id, chat_id, query):
     
     try:
         # Search database
-        movies = await db.search_movies(query)
+        movies = await movies_repo.search_movies(query)
         
         if not movies:
             await send_message(
@@ -20,14 +20,14 @@ async def search_movies(msg, user_id, chat_id, query):
         
         # Show first result
         movie = movies[0]
-        title = movie.get('title', 'Unknown')
-        year = movie.get('year', 'N/A')
-        genres = ', '.join(movie.get('genres', []))
-        quality = movie.get('quality', 'HD')
-        description = movie.get('description', 'No description')
-        poster = movie.get('poster_file_id')
-        lulu_link = movie.get('lulu_stream_link')
-        ht_link = movie.get('htfilesharing_link')
+        title = movie.title or 'Unknown'
+        year = movie.year or 'N/A'
+        genres = ', '.join(movie.genres)
+        quality = movie.quality or 'HD'
+        description = movie.description or 'No description'
+        poster = movie.poster_file_id
+        lulu_link = movie.watch_link
+        ht_link = movie.download_link
         
         caption = (
             f"🎬 **{title}** ({year})\n\n"
@@ -0,0 +1,159 @@
+# homepage.py
+
+"""
+Homepage rows.
+
+Each row in index.html is declared once in HOMEPAGE_SECTIONS and all
+rows are fetched concurrently, so adding a row does not add another
+serial MongoDB round trip.
+
+The rendered page reads from `homepage_snapshot`, an in-memory copy of
+every row that a background task rebuilds on a schedule and shortly
+after catalog writes. With HOMEPAGE_SNAPSHOT_PERSIST=true the snapshot
+is also stored in db.homepage_snapshots so other workers can adopt it
+instead of rebuilding it themselves.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from catalog import on_catalog_change
+from models import Movie, CARD_PROJECTION
+from singleflight import SingleFlight
+from trending import load_trending_movies
+
+logger = logging.getLogger(__name__)
+
+HOMEPAGE_ROW_SIZE = 10
+
+# template variable -> (filter, sort); None = from the trending scores
+HOMEPAGE_SECTIONS = {
+    "latest_movies": ({}, [("_id", -1)]),
+    "trending_movies": None,
+    "tamil_movies": ({"language": "Tamil"}, [("_id", -1)]),
+    "hindi_movies": ({"language": "Hindi"}, [("_id", -1)]),
+    "action_movies": ({"genres": "Action"}, [("_id", -1)]),
+    "drama_movies": ({"genres": "Drama"}, [("_id", -1)]),
+}
+
+
+async def _load_section(db, query, sort):
+    return (
+        await db.movies.find(query, CARD_PROJECTION)
+        .sort(sort)
+        .limit(HOMEPAGE_ROW_SIZE)
+        .to_list(length=HOMEPAGE_ROW_SIZE)
+    )
+
+
+async def _load_trending(db):
+    movies = await load_trending_movies(db, HOMEPAGE_ROW_SIZE, CARD_PROJECTION)
+    if not movies:
+        # No recent views yet (fresh install): fall back to all-time views
+        movies = await _load_section(db, {}, [("views", -1)])
+    return movies
+
+
+async def load_homepage_sections(db):
+    """Return {template variable: [card documents]} for every homepage row."""
+    names = list(HOMEPAGE_SECTIONS)
+    rows = await asyncio.gather(
+        *(
+            _load_trending(db) if HOMEPAGE_SECTIONS[name] is None
+            else _load_section(db, *HOMEPAGE_SECTIONS[name])
+            for name in names
+        )
+    )
+    return dict(zip(names, rows))
+
+
+class HomepageSnapshot:
+    """Materialized homepage rows, rebuilt in the background."""
+
+    # Writes often come in bursts (bulk uploads); wait this long before rebuilding
+    DEBOUNCE_SECONDS = 2
+
+    def __init__(self):
+        self.sections = None
+        self.built_at = None
+        self.generation = 0
+        self._dirty = asyncio.Event()
+        self._flight = SingleFlight("homepage")
+
+    def mark_dirty(self):
+        """Ask the background task to rebuild soon."""
+        self._dirty.set()
+
+    def _adopt(self, sections, built_at):
+        self.sections = sections
+        self.built_at = built_at
+        self.generation += 1
+
+    def _adopt_docs(self, sections, built_at):
+        self._adopt(
+            {name: [Movie.from_doc(doc) for doc in docs] for name, docs in sections.items()},
+            built_at,
+        )
+
+    async def refresh(self, db, persist=False):
+        """
+        Rebuild every row from MongoDB (and store it if persist).
+        Concurrent refreshes (cold-start requests, the background task)
+        share one rebuild.
+        """
+        await self._flight.do(("refresh", persist), lambda: self._refresh(db, persist))
+
+    async def _refresh(self, db, persist):
+        sections = await load_homepage_sections(db)
+        built_at = datetime.utcnow()
+        self._adopt_docs(sections, built_at)
+
+        if persist:
+            await db.homepage_snapshots.replace_one(
+                {"_id": "homepage"},
+                {"sections": sections, "built_at": built_at},
+                upsert=True,
+            )
+
+    async def load_persisted(self, db, max_age):
+        """Adopt the stored snapshot if it is newer than ours and younger than max_age."""
+        doc = await db.homepage_snapshots.find_one({"_id": "homepage"})
+        if not doc:
+            return False
+
+        built_at = doc.get("built_at")
+        if not built_at or datetime.utcnow() - built_at > timedelta(seconds=max_age):
+            return False
+        if self.built_at and built_at <= self.built_at:
+            return True
+
+        self._adopt_docs(doc["sections"], built_at)
+        return True
+
+    async def refresh_forever(self, db, interval, persist=False):
+        """Rebuild every `interval` seconds, or soon after mark_dirty()."""
+        while True:
+            try:
+                await asyncio.wait_for(self._dirty.wait(), timeout=interval)
+                dirty = True
+            except asyncio.TimeoutError:
+                dirty = False
+
+            try:
+                if dirty:
+                    await asyncio.sleep(self.DEBOUNCE_SECONDS)
+                    self._dirty.clear()
+                    await self.refresh(db, persist=persist)
+                elif not (persist and await self.load_persisted(db, interval / 2)):
+                    await self.refresh(db, persist=persist)
+            except Exception as e:
+                logger.error(f"❌ Homepage snapshot refresh failed: {e}")
+
+
+homepage_snapshot = HomepageSnapshot()
+
+
+@on_catalog_change
+def _rebuild_homepage(op, movie):
+    homepage_snapshot.mark_dirty()
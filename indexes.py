@@ -0,0 +1,139 @@
+# indexes.py
+
+"""
+MongoDB index declarations and startup checks.
+
+Every index the app relies on is declared once in REQUIRED_INDEXES.
+At startup `bootstrap_indexes(db)` creates the missing ones, reports
+indexes nobody uses, and runs `explain` on each hot query so an
+unindexed collection scan is caught before it hits production traffic.
+
+With INDEX_STRICT=true the app refuses to start if a hot query would
+still be a COLLSCAN; otherwise it only logs a warning.
+"""
+
+import logging
+from datetime import datetime
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_INDEXES = {
+    "movies": [
+        IndexModel([("language", ASCENDING), ("_id", DESCENDING)], name="language_newest"),
+        IndexModel([("genres", ASCENDING), ("_id", DESCENDING)], name="genres_newest"),
+        IndexModel([("views", DESCENDING)], name="views_desc"),
+    ],
+    "users": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    "verif_users": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    "verif_tokens": [
+        IndexModel([("user_id", ASCENDING), ("token", ASCENDING)], name="user_token"),
+        # Pooled tokens are looked up by token alone
+        IndexModel([("token", ASCENDING)], name="token"),
+        # Expired tokens are removed by MongoDB itself
+        IndexModel([("expires", ASCENDING)], name="expires_ttl", expireAfterSeconds=0),
+    ],
+    "view_buckets": [
+        IndexModel([("movie_id", ASCENDING), ("hour", ASCENDING)], name="movie_hour", unique=True),
+        # Hourly view counts are only needed for the trending window
+        IndexModel([("hour", ASCENDING)], name="hour_ttl", expireAfterSeconds=14 * 24 * 3600),
+    ],
+}
+
+# (collection, filter, sort) for every query on a hot path
+HOT_QUERIES = [
+    ("verif_users", {"user_id": "0"}, None),
+    ("verif_tokens", {"user_id": "0", "token": "x"}, None),
+    ("verif_tokens", {"token": "x"}, None),
+    ("movies", {"language": "Tamil"}, [("_id", -1)]),
+    ("movies", {"genres": "Action"}, [("_id", -1)]),
+    ("movies", {}, [("views", -1)]),
+    ("view_buckets", {"hour": {"$gte": datetime(1970, 1, 1)}}, None),
+    ("users", {"user_id": 0}, None),
+]
+
+
+class MissingIndexError(RuntimeError):
+    """Raised in strict mode when a hot query cannot use an index."""
+
+
+async def ensure_indexes(db):
+    """Create every declared index that does not exist yet."""
+    for collection, models in REQUIRED_INDEXES.items():
+        existing = await db[collection].index_information()
+        missing = [m for m in models if m.document["name"] not in existing]
+        if not missing:
+            continue
+
+        names = ", ".join(m.document["name"] for m in missing)
+        logger.warning(f"⚠️ {collection}: missing indexes {names}, building")
+        for model in missing:
+            try:
+                await db[collection].create_indexes([model])
+            except OperationFailure as e:
+                # e.g. duplicate user_id rows block a unique index
+                logger.error(
+                    f"❌ {collection}: could not build {model.document['name']}: {e}"
+                )
+
+
+async def report_unused_indexes(db):
+    """Log indexes that are not declared here and have never been used."""
+    for collection, models in REQUIRED_INDEXES.items():
+        declared = {m.document["name"] for m in models} | {"_id_"}
+        try:
+            stats = await db[collection].aggregate([{"$indexStats": {}}]).to_list(length=None)
+        except OperationFailure:
+            return  # $indexStats needs clusterMonitor on some hosted plans
+
+        for stat in stats:
+            if stat["name"] not in declared and stat["accesses"]["ops"] == 0:
+                logger.warning(f"⚠️ {collection}: index {stat['name']} is unused")
+
+
+def _stages(plan):
+    """Yield every stage name in an explain plan tree."""
+    yield plan.get("stage")
+    if "inputStage" in plan:
+        yield from _stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+async def find_unindexed_queries(db):
+    """Return a description of every hot query whose winning plan is a COLLSCAN."""
+    unindexed = []
+    for collection, query, sort in HOT_QUERIES:
+        cursor = db[collection].find(query).limit(1)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = (await cursor.explain())["queryPlanner"]["winningPlan"]
+        # Sharded / newer servers wrap the plan one level deeper
+        plan = plan.get("queryPlan", plan)
+        if "COLLSCAN" in _stages(plan):
+            unindexed.append(f"{collection}.find({query}).sort({sort})")
+    return unindexed
+
+
+async def bootstrap_indexes(db, strict=False):
+    """Create missing indexes, report unused ones and verify hot queries."""
+    await ensure_indexes(db)
+    await report_unused_indexes(db)
+
+    unindexed = await find_unindexed_queries(db)
+    for description in unindexed:
+        logger.warning(f"⚠️ Unindexed hot query: {description}")
+
+    if unindexed and strict:
+        raise MissingIndexError(
+            f"{len(unindexed)} hot queries would run as collection scans"
+        )
+
+    if not unindexed:
+        logger.info("✅ MongoDB indexes verified")
@@ -1,62 +1,40 @@
+from startup_timer import startup_timer
+
 import os
-from datetime import datetime, timedelta
+import time
+import asyncio
+import importlib
+import logging
+from datetime import datetime
+from typing import Optional
 
 from fastapi import FastAPI, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from starlette.middleware.sessions import SessionMiddleware
-import uvicorn
-
-from pyrogram import Client, filters
-from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 from config import (
-    BOT_TOKEN,
-    API_ID,
-    API_HASH,
-    ADMIN_IDS,
+    APP_ROLE,
     SECRET_KEY,
-    REQUEST_GROUP,
-    BASE_URL,
-    VERIFICATION_PERIOD_HOURS,
-    VERIFICATION_TUTORIAL_LINK,
-    VERIFICATION_TUTORIAL_NAME,
+    SUGGEST_REFRESH_SECONDS,
+    HOMEPAGE_REFRESH_SECONDS,
+    HOMEPAGE_SNAPSHOT_PERSIST,
+    TRENDING_RELOAD_SECONDS,
+    TRENDING_WINDOW_HOURS,
 )
 
 from database import get_database
-from verification import create_universal_shortlink, generate_verify_token
-from verification_checker import check_user_access, mark_user_verified
-
-# ============================================
-# FASTAPI + DB + STATIC
-# ============================================
-
-app = FastAPI()
-db = get_database()
-
-app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
-app.mount("/static", StaticFiles(directory="static"), name="static")
-
-templates = Jinja2Templates(directory="templates")
-
-# ============================================
-# PYROGRAM BOT (SINGLE CLIENT)
-# ============================================
-
-bot = Client(
-    "moviebot",
-    api_id=API_ID,
-    api_hash=API_HASH,
-    bot_token=BOT_TOKEN,
-    in_memory=True,
+from suggest import suggest_index
+from homepage import homepage_snapshot
+from trending import trending
+from services import (
+    start_core_services,
+    stop_core_services,
+    core_warm_up_steps,
+    warm_up,
 )
-
-print("✅ Pyrogram bot client created")
-
-# ============================================
-# ADMIN ROUTES
-# ============================================
+from signed_tokens import is_signed_token, read_token, seen_nonces
+from verification_checker import mark_user_verified
 
 from admin_routes import (
     admin_login_page,
@@ -67,21 +45,8 @@ from admin_routes import (
     admin_add_movie_post,
     admin_movies_page,
     admin_delete_movie,
+    admin_cache_stats,
 )
-
-app.get("/admin", response_class=HTMLResponse)(admin_login_page)
-app.post("/admin", response_class=HTMLResponse)(admin_login_post)
-app.get("/admin/logout")(admin_logout)
-app.get("/admin/dashboard", response_class=HTMLResponse)(admin_dashboard)
-app.get("/admin/add-movie", response_class=HTMLResponse)(admin_add_movie_page)
-app.post("/admin/add-movie", response_class=HTMLResponse)(admin_add_movie_post)
-app.get("/admin/movies", response_class=HTMLResponse)(admin_movies_page)
-app.post("/admin/delete-movie/{movie_id}")(admin_delete_movie)
-
-# ============================================
-# USER WEB ROUTES
-# ============================================
-
 from user_routes import (
     homepage,
     movie_detail,
@@ -90,173 +55,61 @@ from user_routes import (
     browse_genre,
     watch_movie,
     download_movie,
+    suggest_titles,
+    trending_movies,
 )
 
-app.get("/", response_class=HTMLResponse)(homepage)
-app.get("/movie/{movie_id}", response_class=HTMLResponse)(movie_detail)
-app.get("/search", response_class=HTMLResponse)(search_movies)
-app.get("/language/{language}", response_class=HTMLResponse)(browse_language)
-app.get("/genre/{genre}", response_class=HTMLResponse)(browse_genre)
+logger = logging.getLogger(__name__)
+
+db = get_database()
 
-# NEW: watch / download redirect routes
-app.get("/watch/{movie_id}")(watch_movie)
-app.get("/download/{movie_id}")(download_movie)
+startup_timer.since_start("imports")
 
 # ============================================
-# TELEGRAM BOT HANDLERS
+# VERIFICATION CALLBACK
 # ============================================
 
 
-@bot.on_message(filters.command("start") & filters.private)
-async def start_command(client, message):
-    user_id = message.from_user.id
-    username = message.from_user.username or message.from_user.first_name
-
-    await db.users.update_one(
-        {"user_id": user_id},
-        {
-            "$set": {
-                "username": username,
-                "user_id": user_id,
-            },
-            "$setOnInsert": {"joined_at": message.date},
-        },
-        upsert=True,
-    )
-
-    text = (
-        "🎬 **Welcome to Movie Magic Club!**\n\n"
-        f"Hi {username}! 👋\n\n"
-        "🔍 Type a movie name to search.\n"
-        "🌐 Or open the website to browse.\n"
-    )
-
-    buttons = InlineKeyboardMarkup(
-        [
-            [InlineKeyboardButton("🌐 Browse Website", url=BASE_URL)],
-            [InlineKeyboardButton("👥 Join Group", url=REQUEST_GROUP)],
-        ]
-    )
-
-    await message.reply_text(text, reply_markup=buttons)
-
-
-@bot.on_message(filters.text & filters.private & ~filters.command(["start"]))
-async def search_movie(client, message):
-    user_id = message.from_user.id
-    query = message.text.strip()
-
-    # ===== Verification limit =====
-    access = await check_user_access(user_id, db)
-    if not access["allowed"] and access.get("need_verification"):
-        verify_token = generate_verify_token()
-        redirect_url = f"{BASE_URL}/verified?uid={user_id}&token={verify_token}"
-        shortlink_url = create_universal_shortlink(redirect_url)
-
-        await db.verif_tokens.insert_one(
-            {
-                "user_id": str(user_id),
-                "token": verify_token,
-                "created": datetime.utcnow(),
-                "expires": datetime.utcnow()
-                + timedelta(hours=VERIFICATION_PERIOD_HOURS),
-            }
-        )
-
-        buttons = InlineKeyboardMarkup(
-            [
-                [InlineKeyboardButton("✅ Verify", url=shortlink_url)],
-                [
-                    InlineKeyboardButton(
-                        VERIFICATION_TUTORIAL_NAME,
-                        url=VERIFICATION_TUTORIAL_LINK,
-                    )
-                ],
-            ]
+async def _verified_signed(token: str):
+    """VERIFICATION_TOKEN_MODE=signed: no database lookup, one use per link."""
+    claims = read_token(token)
+    if not claims:
+        return HTMLResponse(
+            "Invalid or expired verification token.", status_code=400
         )
 
-        await message.reply_text(
-            "You reached today's free limit.\n"
-            "Complete this one-time verification to unlock movies.",
-            reply_markup=buttons,
+    if time.time() > claims["exp"]:
+        return HTMLResponse(
+            "Verification token expired. Please verify again.",
+            status_code=400,
         )
-        return
 
-    # ===== Movie search =====
-    movies = await db.movies.find(
-        {"title": {"$regex": query, "$options": "i"}}
-    ).to_list(length=10)
-
-    if not movies:
-        await message.reply_text(
-            "😕 Movie not found in database.\n"
-            "You can request it in our group."
+    if not seen_nonces.add(claims["nonce"], claims["exp"]):
+        return HTMLResponse(
+            "Verification link already used. Please verify again.",
+            status_code=400,
         )
-        return
-
-    for movie in movies:
-        try:
-            title = movie.get("title", "Unknown")
-            year = movie.get("year", "N/A")
-            language = movie.get("language", "N/A")
-            genres = ", ".join(movie.get("genres", []))
-            quality = movie.get("quality", "N/A")
-            description = movie.get("description", "No description")
-            views = movie.get("views", 0)
-
-            caption = (
-                f"🎬 **{title}** ({year})\n\n"
-                f"🗣️ Language: {language}\n"
-                f"🎭 Genre: {genres}\n"
-                f"📺 Quality: {quality}\n"
-                f"👁 Views: {views}\n\n"
-                f"📝 {description}\n"
-            )
-
-            movie_url = f"{BASE_URL}/movie/{movie['_id']}"
-
-            buttons = InlineKeyboardMarkup(
-                [
-                    [
-                        InlineKeyboardButton(
-                            "▶️ Watch", url=movie.get("lulu_link")
-                        ),
-                        InlineKeyboardButton(
-                            "⬇️ Download", url=movie.get("ht_link")
-                        ),
-                    ],
-                    [InlineKeyboardButton("🌐 View on Website", url=movie_url)],
-                ]
-            )
 
-            poster_file_id = movie.get("poster_file_id")
-            if poster_file_id:
-                await message.reply_photo(
-                    photo=poster_file_id,
-                    caption=caption,
-                    reply_markup=buttons,
-                )
-            else:
-                await message.reply_text(caption, reply_markup=buttons)
-
-            await db.movies.update_one(
-                {"_id": movie["_id"]},
-                {"$inc": {"views": 1}},
-            )
-
-        except Exception as e:
-            print(f"Error sending movie: {e}")
-            continue
+    try:
+        await mark_user_verified(claims["user_id"], db)
+    except Exception:
+        seen_nonces.discard(claims["nonce"])
+        raise
 
+    return RedirectResponse(url="/")
 
-# ============================================
-# VERIFICATION CALLBACK
-# ============================================
 
+async def verified(request: Request, token: str, uid: Optional[str] = None):
+    # Links signed before/after a VERIFICATION_TOKEN_MODE switch keep working
+    if is_signed_token(token):
+        return await _verified_signed(token)
 
-@app.get("/verified")
-async def verified(request: Request, uid: str, token: str):
-    row = await db.verif_tokens.find_one({"user_id": str(uid), "token": token})
+    if uid is None:
+        # Pooled tokens (token_pool.py) carry no uid; the row was bound at handout
+        query = {"token": token, "user_id": {"$ne": None}}
+    else:
+        query = {"user_id": str(uid), "token": token}
+    row = await db.verif_tokens.find_one(query)
     if not row:
         return HTMLResponse(
             "Invalid or expired verification token.", status_code=400
@@ -269,7 +122,7 @@ async def verified(request: Request, uid: str, token: str):
             status_code=400,
         )
 
-    await mark_user_verified(uid, db)
+    await mark_user_verified(row["user_id"], db)
     await db.verif_tokens.delete_one({"_id": row["_id"]})
 
     return RedirectResponse(url="/")
@@ -280,26 +133,142 @@ async def verified(request: Request, uid: str, token: str):
 # ============================================
 
 
-@app.get("/health")
 async def health_check():
     return {"status": "healthy"}
 
 
 # ============================================
-# STARTUP / SHUTDOWN (SINGLE START)
+# APP FACTORY
 # ============================================
 
 
-@app.on_event("startup")
-async def startup_event():
-    await bot.start()
-    print("✅ Bot started")
+def _import_bot(loop):
+    """
+    Import bot.py in a worker thread (~0.7s, mostly pyrogram.raw) so the
+    loop keeps serving meanwhile. Pyrogram looks up the event loop at
+    import and in Client(), so the thread is pointed at the app's loop.
+    """
+    asyncio.set_event_loop(loop)
+    try:
+        return importlib.import_module("bot")
+    finally:
+        asyncio.set_event_loop(None)
+
+
+def create_app(role=APP_ROLE):
+    """
+    Build the FastAPI app.
+
+    role="web": website only; safe to run with `uvicorn --workers N`.
+    role="all": website plus the Telegram bot in the same process (one
+    worker only - every worker would start its own bot session).
+    The bot on its own is `python bot.py` (APP_ROLE=bot).
+    """
+    if role not in ("all", "web"):
+        raise ValueError(f"APP_ROLE={role!r} has no web app; run `python bot.py`")
+
+    app = FastAPI()
+    app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
+    app.mount("/static", StaticFiles(directory="static"), name="static")
+
+    # ---------- admin ----------
+    app.get("/admin", response_class=HTMLResponse)(admin_login_page)
+    app.post("/admin", response_class=HTMLResponse)(admin_login_post)
+    app.get("/admin/logout")(admin_logout)
+    app.get("/admin/dashboard", response_class=HTMLResponse)(admin_dashboard)
+    app.get("/admin/add-movie", response_class=HTMLResponse)(admin_add_movie_page)
+    app.post("/admin/add-movie", response_class=HTMLResponse)(admin_add_movie_post)
+    app.get("/admin/movies", response_class=HTMLResponse)(admin_movies_page)
+    app.post("/admin/delete-movie/{movie_id}")(admin_delete_movie)
+    app.get("/admin/cache-stats")(admin_cache_stats)
+
+    # ---------- user pages ----------
+    app.get("/", response_class=HTMLResponse)(homepage)
+    app.get("/movie/{movie_id}", response_class=HTMLResponse)(movie_detail)
+    app.get("/search", response_class=HTMLResponse)(search_movies)
+    app.get("/language/{language}", response_class=HTMLResponse)(browse_language)
+    app.get("/genre/{genre}", response_class=HTMLResponse)(browse_genre)
+
+    # NEW: watch / download redirect routes
+    app.get("/watch/{movie_id}")(watch_movie)
+    app.get("/download/{movie_id}")(download_movie)
+
+    # Search-as-you-type completions
+    app.get("/api/suggest")(suggest_titles)
+    app.get("/api/trending")(trending_movies)
+
+    app.get("/verified")(verified)
+    app.get("/health")(health_check)
+
+    # ---------- startup / shutdown ----------
+
+    # Long-running background loops, cancelled on shutdown
+    background_tasks = []
+    # Pyrogram is imported (and the bot connected) in the background, role "all" only
+    bot_client = None
+
+    async def _start_bot():
+        nonlocal bot_client
+        try:
+            with startup_timer.phase("bot import"):
+                bot = await asyncio.to_thread(_import_bot, asyncio.get_running_loop())
+            bot_client = bot.bot
+            await bot.start_bot()
+        except Exception as e:
+            logger.error(f"❌ Bot failed to start: {e}")
+
+    @app.on_event("startup")
+    async def startup_event():
+        """
+        Only what must precede serving runs here; /health answers as soon
+        as it returns. Index, suggestions, trending, homepage and the bot
+        are warmed up in the background (each degrades gracefully until
+        ready).
+        """
+        await start_core_services(db, background_tasks)
+
+        steps = core_warm_up_steps(db) + [
+            ("suggest", lambda: suggest_index.build(db)),
+            ("trending", lambda: trending.load(db, TRENDING_WINDOW_HOURS)),
+            ("homepage", lambda: homepage_snapshot.refresh(db, persist=HOMEPAGE_SNAPSHOT_PERSIST)),
+        ]
+        background_tasks.append(asyncio.create_task(warm_up(steps)))
+
+        background_tasks.append(
+            asyncio.create_task(suggest_index.refresh_forever(db, SUGGEST_REFRESH_SECONDS))
+        )
+        background_tasks.append(
+            asyncio.create_task(
+                trending.reload_forever(db, TRENDING_RELOAD_SECONDS, TRENDING_WINDOW_HOURS)
+            )
+        )
+        background_tasks.append(
+            asyncio.create_task(
+                homepage_snapshot.refresh_forever(
+                    db, HOMEPAGE_REFRESH_SECONDS, persist=HOMEPAGE_SNAPSHOT_PERSIST
+                )
+            )
+        )
+
+        if role == "all":
+            background_tasks.append(asyncio.create_task(_start_bot()))
+
+        startup_timer.since_start("serving")
+
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        # Stop taking updates first (as bot.run_bot does): handlers still
+        # running would otherwise count views after the final flush
+        if bot_client is not None and bot_client.is_connected:
+            await bot_client.stop()
+            logger.info("🛑 Bot stopped")
+        await stop_core_services(db, background_tasks)
 
+    return app
 
-@app.on_event("shutdown")
-async def shutdown_event():
-    await bot.stop()
-    print("🛑 Bot stopped")
+
+# `uvicorn main:app` - the role comes from APP_ROLE
+app = create_app()
 
 
 # ============================================
@@ -307,5 +276,7 @@ async def shutdown_event():
 # ============================================
 
 if __name__ == "__main__":
+    import uvicorn
+
     port = int(os.getenv("PORT", 8080))
     uvicorn.run("main:app", host="0.0.0.0", port=port, log_level="info")
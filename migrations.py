@@ -0,0 +1,130 @@
+# migrations.py
+
+"""
+Versioned, batched schema migrations for db.movies.
+
+Each migration rewrites documents to the next `schema_version`. Work is
+done in _id order in batches of unordered bulk writes, and the last
+processed _id is saved in db.migrations after every batch, so an
+interrupted run resumes where it stopped.
+
+    python migrations.py --dry-run      # report what would change
+    python migrations.py                # apply pending migrations
+    python migrations.py --batch-size 200
+"""
+
+import argparse
+import asyncio
+import logging
+
+from pymongo import UpdateOne
+
+from models import WATCH_LINK_FIELDS, DOWNLOAD_LINK_FIELDS, POSTER_FIELDS
+
+logger = logging.getLogger(__name__)
+
+
+def _canonical_links_v1(doc):
+    """
+    v1: one field per link / poster.
+
+    watch_link     <- watch_url, stream_link, lulu_link, lulu_stream_link
+    download_link  <- download_url, ht_link, htfilesharing_link
+    poster_file_id <- poster, poster_id
+    """
+    set_fields, unset_fields = {}, {}
+    for canonical, names in (
+        ("watch_link", WATCH_LINK_FIELDS),
+        ("download_link", DOWNLOAD_LINK_FIELDS),
+        ("poster_file_id", POSTER_FIELDS),
+    ):
+        value = next((doc[n] for n in names if doc.get(n)), None)
+        if value and doc.get(canonical) != value:
+            set_fields[canonical] = value
+        for name in names:
+            if name != canonical and name in doc:
+                unset_fields[name] = ""
+    return set_fields, unset_fields
+
+
+# version -> function(doc) returning ($set fields, $unset fields)
+MIGRATIONS = {
+    1: _canonical_links_v1,
+}
+
+SCHEMA_VERSION = max(MIGRATIONS)
+
+
+async def run_migration(db, version, batch_size=500, dry_run=False):
+    """Apply one migration to every document below `version`. Returns docs changed."""
+    migrate = MIGRATIONS[version]
+    progress_id = f"movies_v{version}"
+    progress = await db.migrations.find_one({"_id": progress_id}) or {}
+    if progress.get("done"):
+        logger.info(f"✅ Migration v{version} already applied")
+        return 0
+
+    last_id = None if dry_run else progress.get("last_id")
+    changed = progress.get("changed", 0) if not dry_run else 0
+
+    while True:
+        query = {"schema_version": {"$not": {"$gte": version}}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await db.movies.find(query).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+        if not batch:
+            break
+
+        ops = []
+        for doc in batch:
+            set_fields, unset_fields = migrate(doc)
+            update = {"$set": {**set_fields, "schema_version": version}}
+            if unset_fields:
+                update["$unset"] = unset_fields
+            ops.append(UpdateOne({"_id": doc["_id"]}, update))
+            if set_fields or unset_fields:
+                changed += 1
+                if dry_run:
+                    logger.info(f"  {doc['_id']}: set {sorted(set_fields)} unset {sorted(unset_fields)}")
+
+        last_id = batch[-1]["_id"]
+        if not dry_run:
+            await db.movies.bulk_write(ops, ordered=False)
+            await db.migrations.update_one(
+                {"_id": progress_id},
+                {"$set": {"last_id": last_id, "changed": changed}},
+                upsert=True,
+            )
+        logger.info(f"🔄 v{version}: processed up to {last_id} ({changed} changed)")
+
+    if not dry_run:
+        await db.migrations.update_one(
+            {"_id": progress_id}, {"$set": {"done": True}}, upsert=True
+        )
+    logger.info(f"✅ Migration v{version} {'dry run' if dry_run else 'done'}: {changed} documents")
+    return changed
+
+
+async def migrate_all(db, batch_size=500, dry_run=False):
+    for version in sorted(MIGRATIONS):
+        await run_migration(db, version, batch_size=batch_size, dry_run=dry_run)
+
+
+async def schema_is_current(db):
+    """True once every migration has completed (hot paths may trust canonical fields)."""
+    done = await db.migrations.count_documents(
+        {"_id": {"$in": [f"movies_v{v}" for v in MIGRATIONS]}, "done": True}
+    )
+    return done == len(MIGRATIONS)
+
+
+if __name__ == "__main__":
+    from database import get_database
+
+    parser = argparse.ArgumentParser(description="Migrate db.movies to the current schema")
+    parser.add_argument("--dry-run", action="store_true", help="report changes without writing")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    asyncio.run(migrate_all(get_database(), batch_size=args.batch_size, dry_run=args.dry_run))
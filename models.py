@@ -0,0 +1,108 @@
+# models.py
+
+"""
+Compact movie model and named projections.
+
+Every listing/detail query asks MongoDB only for the fields its view
+renders (CARD_PROJECTION, DETAIL_PROJECTION, ...) and wraps the result
+in a slotted `Movie`, so templates and the bot always see the same
+attribute names whatever shape the stored document has.
+
+    from models import Movie, CARD_PROJECTION
+
+    docs = await db.movies.find(query, CARD_PROJECTION).to_list(length=24)
+    movies = [Movie.from_doc(doc) for doc in docs]
+"""
+
+from dataclasses import dataclass, field
+from typing import Optional
+
+# Canonical field first, then legacy names in lookup order.
+# migrations.py rewrites old documents to the canonical names.
+WATCH_LINK_FIELDS = ("watch_link", "watch_url", "stream_link", "lulu_link", "lulu_stream_link")
+DOWNLOAD_LINK_FIELDS = ("download_link", "download_url", "ht_link", "htfilesharing_link")
+POSTER_FIELDS = ("poster_file_id", "poster", "poster_id")
+
+# Set at startup once every migration has run; from then on only the
+# canonical fields are projected and read.
+_schema_current = False
+
+
+def set_schema_current(current: bool):
+    global _schema_current
+    _schema_current = bool(current)
+
+
+def _fields(*names):
+    return {name: 1 for name in names}
+
+
+# Movie cards (homepage rows, browse, search results)
+CARD_PROJECTION = _fields("title", "year", "language", "quality")
+
+# /movie/{id} page
+DETAIL_PROJECTION = _fields(
+    "title", "year", "language", "quality", "genres", "description", "views",
+    *POSTER_FIELDS, *WATCH_LINK_FIELDS, *DOWNLOAD_LINK_FIELDS,
+)
+
+# Movie card sent by the Telegram bot
+CAPTION_PROJECTION = DETAIL_PROJECTION
+
+# /admin/movies table
+ADMIN_ROW_PROJECTION = _fields("title", "year", "genres", "quality", "views")
+
+
+PROJECTIONS = {
+    "card": CARD_PROJECTION,
+    "detail": DETAIL_PROJECTION,
+    "caption": CAPTION_PROJECTION,
+    "admin_row": ADMIN_ROW_PROJECTION,
+}
+
+
+def _first(doc, names):
+    if _schema_current:
+        return doc.get(names[0]) or None
+    for name in names:
+        value = doc.get(name)
+        if value:
+            return value
+    return None
+
+
+@dataclass(slots=True)
+class Movie:
+    id: object
+    title: str = ""
+    year: object = ""
+    language: str = ""
+    quality: str = ""
+    genres: list = field(default_factory=list)
+    description: str = ""
+    views: int = 0
+    poster_file_id: Optional[str] = None
+    watch_link: Optional[str] = None
+    download_link: Optional[str] = None
+
+    @property
+    def _id(self):
+        # Templates link to /movie/{{ movie._id }}
+        return self.id
+
+    @classmethod
+    def from_doc(cls, doc):
+        """Build a Movie from a (possibly projected) MongoDB document."""
+        return cls(
+            id=doc["_id"],
+            title=doc.get("title") or "",
+            year=doc.get("year") or "",
+            language=doc.get("language") or "",
+            quality=doc.get("quality") or "",
+            genres=doc.get("genres") or [],
+            description=doc.get("description") or "",
+            views=int(doc.get("views") or 0),
+            poster_file_id=_first(doc, POSTER_FIELDS),
+            watch_link=_first(doc, WATCH_LINK_FIELDS),
+            download_link=_first(doc, DOWNLOAD_LINK_FIELDS),
+        )
@@ -0,0 +1,100 @@
+# page_cache.py
+
+"""
+Rendered-page cache with ETag / 304 support for the public HTML routes.
+
+    return await page_cache.respond(
+        request, "browse_language", lambda: templates.TemplateResponse(...)
+    )
+
+Pages are stored as rendered bytes keyed on route + path + query string,
+together with the catalog version (plus an optional extra version such
+as the homepage snapshot generation) they were rendered at; any catalog
+write in this process makes them stale.
+
+The ETag is a hash of the rendered bytes. Versions are per-process
+counters, so two workers (or a restarted one) may share a version for
+different content; a content hash never revalidates a page the client
+hasn't actually got.
+"""
+
+import hashlib
+from email.utils import formatdate
+
+from fastapi.responses import Response
+
+from cache import TTLCache
+from catalog import get_catalog_version, get_catalog_changed_at
+from config import PAGE_CACHE_SIZE, PAGE_CACHE_TTL, PAGE_CACHE_MAX_AGE
+
+
+class PageCache:
+    def __init__(self, maxsize, ttl, max_age):
+        self._pages = TTLCache("pages", maxsize=maxsize, ttl=ttl)
+        self.max_age = max_age
+        self._routes = {}  # route -> {"hits", "misses", "not_modified"}
+
+    def _etag(self, body):
+        return f'"{hashlib.blake2b(body, digest_size=10).hexdigest()}"'
+
+    def _headers(self, etag, private):
+        return {
+            "ETag": etag,
+            "Last-Modified": formatdate(get_catalog_changed_at(), usegmt=True),
+            "Cache-Control": (
+                "private, no-cache" if private else f"public, max-age={self.max_age}"
+            ),
+        }
+
+    def _not_modified(self, request, etag):
+        return etag in request.headers.get("if-none-match", "")
+
+    async def respond(self, request, route, render, version="", private=False):
+        """
+        Return a 304, a cached copy, or the freshly rendered response.
+
+        `render` is a callable returning (or an async callable resolving
+        to) a rendered response. Only 200 responses are stored. Use
+        private=True for pages that must be revalidated on every view.
+        """
+        key = (route, request.url.path, request.url.query)
+        rendered_at = (get_catalog_version(), version)
+        stats = self._routes.setdefault(route, {"hits": 0, "misses": 0, "not_modified": 0})
+
+        cached = self._pages.get(key)
+        if cached is not None and cached[0] == rendered_at:
+            _, body, etag = cached
+            headers = self._headers(etag, private)
+            if self._not_modified(request, etag):
+                stats["not_modified"] += 1
+                return Response(status_code=304, headers=headers)
+            stats["hits"] += 1
+            return Response(content=body, media_type="text/html", headers=headers)
+
+        stats["misses"] += 1
+        response = render()
+        if hasattr(response, "__await__"):
+            response = await response
+
+        if response.status_code != 200:
+            return response
+
+        etag = self._etag(response.body)
+        self._pages.set(key, (rendered_at, response.body, etag))
+        headers = self._headers(etag, private)
+        if self._not_modified(request, etag):
+            # Re-rendered (counted as a miss) to the bytes the client already has
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
+        return response
+
+    def stats(self):
+        routes = {}
+        for route, counts in self._routes.items():
+            total = sum(counts.values())
+            served = counts["hits"] + counts["not_modified"]
+            routes[route] = {**counts, "hit_rate": round(served / total, 4) if total else 0.0}
+        return routes
+
+
+page_cache = PageCache(PAGE_CACHE_SIZE, PAGE_CACHE_TTL, PAGE_CACHE_MAX_AGE)
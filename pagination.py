@@ -0,0 +1,46 @@
+# pagination.py
+
+"""
+Keyset ("after") cursors for browse and search pages.
+
+Browse pages are ordered by _id descending, so the cursor is simply the
+last _id shown. Search pages are ordered by (score desc, id), so the
+cursor carries both. Cursors are opaque strings in URLs: ?after=...
+"""
+
+import math
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+
+def encode_id_cursor(movie_id) -> str:
+    return str(movie_id)
+
+
+def decode_id_cursor(token):
+    """ObjectId from a browse cursor; ValueError if malformed."""
+    try:
+        return ObjectId(token)
+    except (InvalidId, TypeError):
+        raise ValueError(f"Invalid cursor: {token!r}")
+
+
+def encode_search_cursor(after) -> str:
+    score, movie_id = after
+    return f"{score:.6f}_{movie_id}"
+
+
+def decode_search_cursor(token):
+    """(score, movie_id str) from a search cursor; ValueError if malformed."""
+    score, sep, movie_id = (token or "").partition("_")
+    if not sep or not movie_id:
+        raise ValueError(f"Invalid cursor: {token!r}")
+    score = float(score)
+    if not math.isfinite(score):
+        # float() accepts "nan" / "inf", which no result ever has
+        raise ValueError(f"Invalid cursor: {token!r}")
+    return score, movie_id
@@ -0,0 +1,213 @@
+# repository.py
+
+"""
+MovieRepository: the one place that reads and writes db.movies.
+
+Routes and bot handlers go through it instead of building their own
+queries, so every read uses a named projection and the shared caches,
+and every write notifies the catalog listeners (search index, caches,
+homepage snapshot).
+
+    from repository import get_movie_repository
+
+    movies = get_movie_repository()
+    page, next_after = await movies.search("leo", limit=24)
+    movie = await movies.get_by_id(movie_id)
+    movie_id = await movies.insert(movie_doc)
+"""
+
+import re
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from cache import query_cache, movie_cache
+from catalog import catalog_changed
+from catalog_sync import catalog_sync
+from database import get_database
+from migrations import SCHEMA_VERSION
+from models import Movie, PROJECTIONS, DETAIL_PROJECTION
+from search_index import search_index, normalize
+from singleflight import SingleFlight
+from view_counter import view_counter
+
+
+# Regex scans while the search index is not ready are not cached, only coalesced
+_fallback_flight = SingleFlight("search_fallback")
+
+
+def to_object_id(movie_id):
+    """ObjectId from a str/ObjectId; None if it is not a valid id."""
+    if isinstance(movie_id, ObjectId):
+        return movie_id
+    try:
+        return ObjectId(movie_id)
+    except (InvalidId, TypeError):
+        return None
+
+
+class MovieRepository:
+    def __init__(self, db):
+        self.db = db
+        self.collection = db.movies
+
+    # ---------- reads ----------
+
+    async def count(self):
+        return await self.collection.count_documents({})
+
+    async def get_by_id(self, movie_id):
+        """
+        One movie (detail fields) by id, or None if the id is invalid or
+        unknown. Read-through movie_cache: hits never touch MongoDB and
+        concurrent misses for the same id share one find_one.
+        """
+        oid = to_object_id(movie_id)
+        if oid is None:
+            return None
+
+        async def load():
+            doc = await self.collection.find_one({"_id": oid}, DETAIL_PROJECTION)
+            # Unknown ids are cached too (as False) so repeated bad links stay cheap
+            return Movie.from_doc(doc) if doc else False
+
+        return await movie_cache.get_or_load(oid, load) or None
+
+    async def get_link(self, movie_id, kind):
+        """(found, url) for the "watch" or "download" redirect."""
+        movie = await self.get_by_id(movie_id)
+        if movie is None:
+            return False, None
+        return True, movie.watch_link if kind == "watch" else movie.download_link
+
+    async def get_many(self, ids, view="card"):
+        """Movies for `ids`, in the same order; unknown ids are skipped."""
+        if not ids:
+            return []
+        docs = await self.collection.find(
+            {"_id": {"$in": list(ids)}}, PROJECTIONS[view]
+        ).to_list(length=len(ids))
+        by_id = {doc["_id"]: doc for doc in docs}
+        return [Movie.from_doc(by_id[movie_id]) for movie_id in ids if movie_id in by_id]
+
+    async def search(self, query, limit=10, after=None, view="card"):
+        """
+        One page of ranked title search results.
+
+        Returns (movies, next_after): movies in rank order and the
+        (score, movie_id) to pass as `after` for the next page, or None
+        when this is the last page. Ids come from the in-memory search
+        index; pages are cached on the normalized query, and identical
+        concurrent searches share one lookup.
+        """
+        key = ("search", normalize(query), limit, after, view)
+
+        if not search_index.ready and key not in query_cache:
+            # Index still building (or failed) - fall back to a literal regex scan.
+            # It has a single page: cursors only come from ranked results.
+            if after is not None:
+                return [], None
+
+            async def scan():
+                docs = await self.collection.find(
+                    {"title": {"$regex": re.escape(query), "$options": "i"}},
+                    PROJECTIONS[view],
+                ).to_list(length=limit)
+                return [Movie.from_doc(doc) for doc in docs], None
+
+            return await _fallback_flight.do(key, scan)
+
+        async def load():
+            # One extra result tells us whether another page exists
+            scored = search_index.search_scored(query, limit=limit + 1, after=after)
+            next_after = None
+            if len(scored) > limit:
+                last_id, last_score = scored[limit - 1]
+                next_after = (last_score, str(last_id))
+
+            movies = await self.get_many([movie_id for movie_id, _ in scored[:limit]], view)
+            return movies, next_after
+
+        return await query_cache.get_or_load(key, load)
+
+    async def search_movies(self, query, limit=10, view="caption"):
+        """Best `limit` matches for a bot query."""
+        movies, _ = await self.search(query, limit=limit, view=view)
+        return movies
+
+    async def list_by(self, field, value, limit, after=None, view="card"):
+        """
+        One page of the newest movies where `field` == value.
+
+        Returns (movies, next_after); each page is a bounded
+        ({field: value, _id < after}) scan of the (field, _id) index.
+        """
+        query = {field: value}
+        if after is not None:
+            query["_id"] = {"$lt": after}
+
+        async def load():
+            docs = (
+                await self.collection.find(query, PROJECTIONS[view])
+                .sort("_id", -1)
+                .limit(limit + 1)
+                .to_list(length=limit + 1)
+            )
+            next_after = docs[limit - 1]["_id"] if len(docs) > limit else None
+            return [Movie.from_doc(doc) for doc in docs[:limit]], next_after
+
+        return await query_cache.get_or_load((field, value, limit, after, view), load)
+
+    async def list_recent(self, limit=20, view="admin_row"):
+        """Newest movies first."""
+        docs = (
+            await self.collection.find({}, PROJECTIONS[view])
+            .sort("_id", -1)
+            .limit(limit)
+            .to_list(length=limit)
+        )
+        return [Movie.from_doc(doc) for doc in docs]
+
+    async def get_all_movies(self, limit=20):
+        """Newest `limit` movies (bot /listmovies)."""
+        return await self.list_recent(limit=limit)
+
+    # ---------- writes ----------
+
+    async def insert(self, movie_doc):
+        """Insert a movie in the canonical schema and return its id."""
+        movie_doc.setdefault("schema_version", SCHEMA_VERSION)
+        movie_doc.setdefault("views", 0)
+        result = await self.collection.insert_one(movie_doc)
+        catalog_changed("insert", movie_doc)
+        await catalog_sync.publish(self.db, "insert", result.inserted_id)
+        return result.inserted_id
+
+    async def add_movie(self, movie_doc):
+        return await self.insert(movie_doc)
+
+    async def delete(self, movie_id):
+        """Delete a movie; True if it existed."""
+        oid = to_object_id(movie_id)
+        if oid is None:
+            return False
+        result = await self.collection.delete_one({"_id": oid})
+        if result.deleted_count:
+            catalog_changed("delete", {"_id": oid})
+            await catalog_sync.publish(self.db, "delete", oid)
+        return bool(result.deleted_count)
+
+    def increment_views(self, movie_id, n=1):
+        """Count a view; written in the next batched flush."""
+        view_counter.record(movie_id, n)
+
+
+_repository = None
+
+
+def get_movie_repository():
+    """Return the process-wide MovieRepository on the shared database."""
+    global _repository
+    if _repository is None:
+        _repository = MovieRepository(get_database())
+    return _repository
@@ -0,0 +1,280 @@
+# search_index.py
+
+"""
+In-memory inverted index over movie titles.
+
+Built once from db.movies at startup and kept up to date by the admin
+add/delete paths, so title searches never run a regex scan in MongoDB.
+
+Usage:
+
+    from search_index import search_index
+
+    await search_index.build(db)
+    ids = search_index.search("pushpa rule", limit=10)
+
+Exact token matches are tried first; when nothing matches, a trigram
+similarity index gives typo-tolerant results ("pushpaa", "jawaan").
+"""
+
+import bisect
+import heapq
+import logging
+import re
+import unicodedata
+from collections import Counter
+
+from catalog import on_catalog_change
+
+logger = logging.getLogger(__name__)
+
+_DIGIT_SPLIT_RE = re.compile(r"(?<=\d)(?=\D)|(?<=\D)(?=\d)")
+
+
+def normalize(text) -> str:
+    """
+    Lowercase, strip Latin accents and punctuation, split letters from
+    digits and collapse whitespace. Combining marks of other scripts
+    (Tamil, Hindi, ...) are kept so those titles stay searchable.
+    """
+    if not text:
+        return ""
+    chars = []
+    for ch in unicodedata.normalize("NFKD", str(text).casefold()):
+        if unicodedata.category(ch).startswith("M"):
+            if chars and chars[-1].isascii():
+                continue
+            chars.append(ch)
+        elif ch.isalnum():
+            chars.append(ch)
+        else:
+            chars.append(" ")
+    text = unicodedata.normalize("NFC", "".join(chars))
+    return " ".join(_DIGIT_SPLIT_RE.sub(" ", text).split())
+
+
+def tokenize(text) -> list:
+    """Split a title/query into index tokens ("Pushpa2" -> ["pushpa", "2"])."""
+    return normalize(text).split()
+
+
+def trigrams(normalized) -> frozenset:
+    """Character trigrams of a normalized string, padded at word edges."""
+    if not normalized:
+        return frozenset()
+    padded = f"  {normalized} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+# Fuzzy matching knobs
+FUZZY_MIN_SIMILARITY = 0.45
+FUZZY_MAX_CANDIDATES = 50  # titles scored exactly per fuzzy query
+FUZZY_COMMON_TRIGRAM_RATIO = 0.2  # skip trigrams found in >20% of titles
+
+
+class SearchIndex:
+    """
+    Token -> movie id postings, plus a sorted vocabulary so the last
+    (possibly half-typed) query token can be matched as a prefix.
+    """
+
+    def __init__(self):
+        self._titles = {}  # movie_id -> normalized title
+        self._tokens = {}  # movie_id -> tuple of tokens
+        self._postings = {}  # token -> set of movie_ids
+        self._vocab = []  # sorted list of tokens
+        self._grams = {}  # movie_id -> frozenset of title trigrams
+        self._gram_postings = {}  # trigram -> set of movie_ids
+        self.ready = False
+
+    def __len__(self):
+        return len(self._titles)
+
+    # ---------- building / updates ----------
+
+    async def build(self, db):
+        """Load every title from db.movies and rebuild the index."""
+        self.clear()
+        cursor = db.movies.find({}, {"title": 1})
+        async for doc in cursor:
+            self._add(doc["_id"], doc.get("title"))
+        self._vocab = sorted(self._postings)
+        self.ready = True
+        logger.info(f"✅ Search index built: {len(self)} titles, {len(self._vocab)} tokens")
+
+    def clear(self):
+        self._titles.clear()
+        self._tokens.clear()
+        self._postings.clear()
+        self._vocab = []
+        self._grams.clear()
+        self._gram_postings.clear()
+        self.ready = False
+
+    def add_movie(self, movie):
+        """Index (or re-index) a single movie document."""
+        movie_id = movie["_id"]
+        if movie_id in self._titles:
+            self.remove_movie(movie_id)
+        for token in self._add(movie_id, movie.get("title")):
+            i = bisect.bisect_left(self._vocab, token)
+            if i == len(self._vocab) or self._vocab[i] != token:
+                self._vocab.insert(i, token)
+
+    def remove_movie(self, movie_id):
+        """Drop a movie from the index. Unknown ids are ignored."""
+        self._titles.pop(movie_id, None)
+        for token in self._tokens.pop(movie_id, ()):
+            ids = self._postings.get(token)
+            if ids is None:
+                continue
+            ids.discard(movie_id)
+            if not ids:
+                del self._postings[token]
+                i = bisect.bisect_left(self._vocab, token)
+                if i < len(self._vocab) and self._vocab[i] == token:
+                    del self._vocab[i]
+        for gram in self._grams.pop(movie_id, ()):
+            ids = self._gram_postings.get(gram)
+            if ids is None:
+                continue
+            ids.discard(movie_id)
+            if not ids:
+                del self._gram_postings[gram]
+
+    def _add(self, movie_id, title):
+        normalized = normalize(title)
+        tokens = tuple(dict.fromkeys(normalized.split()))
+        grams = trigrams(normalized)
+        self._titles[movie_id] = normalized
+        self._tokens[movie_id] = tokens
+        self._grams[movie_id] = grams
+        for token in tokens:
+            self._postings.setdefault(token, set()).add(movie_id)
+        for gram in grams:
+            self._gram_postings.setdefault(gram, set()).add(movie_id)
+        return tokens
+
+    # ---------- lookups ----------
+
+    def _prefix_ids(self, prefix):
+        """All movie ids having a token that starts with prefix."""
+        ids = set()
+        i = bisect.bisect_left(self._vocab, prefix)
+        while i < len(self._vocab) and self._vocab[i].startswith(prefix):
+            ids |= self._postings[self._vocab[i]]
+            i += 1
+        return ids
+
+    def _score(self, movie_id, query_norm, query_tokens):
+        """Higher is better: exact > title prefix > whole-word hits > prefixes."""
+        title = self._titles[movie_id]
+        tokens = self._tokens[movie_id]
+        if title == query_norm:
+            score = 100.0
+        elif title.startswith(query_norm):
+            score = 80.0
+        else:
+            score = 50.0
+        exact = sum(1 for t in query_tokens if t in tokens)
+        score += 10.0 * exact / len(query_tokens)
+        # Prefer shorter titles: "Leo" before "Leo Das Returns"
+        score -= 0.5 * max(len(tokens) - len(query_tokens), 0)
+        return score
+
+    def _exact_matches(self, query):
+        """
+        Return unordered [(movie_id, score), ...], scores in 40..110.
+
+        Every query token must match a title token; the last token may
+        match as a prefix so search-as-you-type works.
+        """
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return []
+
+        candidates = None
+        for n, token in enumerate(query_tokens):
+            if n == len(query_tokens) - 1:
+                ids = self._prefix_ids(token)
+            else:
+                ids = self._postings.get(token, set())
+            candidates = set(ids) if candidates is None else candidates & ids
+            if not candidates:
+                return []
+
+        query_norm = " ".join(query_tokens)
+        return [(mid, self._score(mid, query_norm, query_tokens)) for mid in candidates]
+
+    def _fuzzy_matches(self, query):
+        """
+        Typo-tolerant lookup: unordered [(movie_id, score), ...], scores
+        below every exact match (0..40).
+
+        Only titles sharing trigrams with the query are considered, very
+        common trigrams are skipped when counting, and at most
+        FUZZY_MAX_CANDIDATES titles get an exact similarity score - so
+        the cost is bounded by posting sizes, not by the catalog size.
+        """
+        query_grams = trigrams(normalize(query))
+        if not query_grams:
+            return []
+
+        common = max(FUZZY_MAX_CANDIDATES, len(self) * FUZZY_COMMON_TRIGRAM_RATIO)
+        postings = [self._gram_postings[g] for g in query_grams if g in self._gram_postings]
+        selective = [ids for ids in postings if len(ids) <= common]
+        if not selective:
+            # Only common trigrams matched; the rarest few still narrow it down
+            selective = sorted(postings, key=len)[:3]
+
+        overlap = Counter()
+        for ids in selective:
+            overlap.update(ids)
+        shortlist = heapq.nlargest(FUZZY_MAX_CANDIDATES, overlap, key=overlap.__getitem__)
+
+        scored = []
+        for movie_id in shortlist:
+            title_grams = self._grams[movie_id]
+            common_grams = len(query_grams & title_grams)
+            dice = 2.0 * common_grams / (len(query_grams) + len(title_grams))
+            containment = common_grams / len(query_grams)
+            similarity = (dice + containment) / 2
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                scored.append((movie_id, 40.0 * similarity))
+        return scored
+
+    def search_scored(self, query, limit=10, after=None):
+        """
+        Exact token matches, or fuzzy matches when there are none, as
+        [(movie_id, score), ...] best first.
+
+        Results are totally ordered by (score desc, id), so `after`, the
+        (score, movie_id) of the last result already shown, continues a
+        previous page exactly where it stopped.
+        """
+        scored = self._exact_matches(query) or self._fuzzy_matches(query)
+        ranked = sorted(
+            ((mid, round(score, 6)) for mid, score in scored),
+            key=lambda item: (-item[1], str(item[0])),
+        )
+        if after is not None:
+            last = (-round(after[0], 6), str(after[1]))
+            ranked = [item for item in ranked if (-item[1], str(item[0])) > last]
+        return ranked[:limit]
+
+    def search(self, query, limit=10):
+        """Return a ranked list of movie ids."""
+        return [movie_id for movie_id, _ in self.search_scored(query, limit)]
+
+
+# Process-wide singleton shared by the bot and the website
+search_index = SearchIndex()
+
+
+@on_catalog_change
+def _sync_search_index(op, movie):
+    if op == "insert":
+        search_index.add_movie(movie)
+    elif op == "delete":
+        search_index.remove_movie(movie["_id"])
+
@@ -0,0 +1,136 @@
+# services.py
+
+"""
+Background services shared by the web app and the standalone bot.
+
+Both processes answer movie searches, so both keep the in-memory search
+index, follow other processes' catalog changes (catalog_sync.py) and
+batch view counts. Web-only structures (suggestions, trending, homepage
+snapshot) are added by main.py as extra warm-up steps.
+
+Startup only does what must happen before serving (strict index check,
+schema flag, background loops); everything that can be served degraded
+until it is ready (search index -> regex fallback, homepage -> built on
+first request, bot) is run by `warm_up()` in the background.
+
+    tasks = []
+    await start_core_services(db, tasks)
+    tasks.append(asyncio.create_task(warm_up(core_warm_up_steps(db))))
+    ...
+    await stop_core_services(db, tasks)
+"""
+
+import asyncio
+import logging
+
+from config import (
+    INDEX_STRICT,
+    CATALOG_SYNC_MODE,
+    CATALOG_POLL_SECONDS,
+    VIEW_FLUSH_SECONDS,
+    QUOTA_FLUSH_SECONDS,
+    VERIFICATION_ON,
+    VERIFICATION_TOKEN_MODE,
+    TOKEN_POOL_REFILL_SECONDS,
+)
+from catalog import catalog_changed
+from catalog_sync import catalog_sync
+from indexes import bootstrap_indexes
+from migrations import schema_is_current
+from models import set_schema_current
+from search_index import search_index
+from startup_timer import startup_timer
+from suggest import suggest_index
+from token_pool import token_pool
+from utils.helpers import close_session as close_bot_api_session
+from verification import shortlink_client
+from verification_checker import quota_cache
+from view_counter import view_counter
+
+logger = logging.getLogger(__name__)
+
+
+async def _bootstrap_indexes_in_background(db):
+    try:
+        with startup_timer.phase("indexes"):
+            await bootstrap_indexes(db)
+    except Exception as e:
+        logger.error(f"❌ Index bootstrap failed: {e}")
+
+
+async def resync_catalog(db):
+    """Rebuild everything derived from db.movies (another process's changes were missed)."""
+    await search_index.build(db)
+    if suggest_index.ready:
+        await suggest_index.build(db)
+    catalog_changed("reset", {})
+
+
+async def start_core_services(db, tasks):
+    """
+    Schema flag, catalog sync, view/quota flushing, verification token
+    pool (and indexes if INDEX_STRICT).
+    """
+    if INDEX_STRICT:
+        with startup_timer.phase("indexes"):
+            await bootstrap_indexes(db, strict=True)
+    else:
+        tasks.append(asyncio.create_task(_bootstrap_indexes_in_background(db)))
+
+    with startup_timer.phase("schema check"):
+        set_schema_current(await schema_is_current(db))
+
+    if CATALOG_SYNC_MODE != "off":
+        # Started before the in-memory structures are built so no change is missed
+        tasks.append(
+            asyncio.create_task(
+                catalog_sync.run(
+                    db,
+                    CATALOG_SYNC_MODE,
+                    CATALOG_POLL_SECONDS,
+                    resync=lambda: resync_catalog(db),
+                )
+            )
+        )
+
+    tasks.append(asyncio.create_task(view_counter.flush_forever(db, VIEW_FLUSH_SECONDS)))
+    tasks.append(asyncio.create_task(quota_cache.flush_forever(db, QUOTA_FLUSH_SECONDS)))
+
+    if VERIFICATION_ON and VERIFICATION_TOKEN_MODE == "db" and token_pool.enabled:
+        tasks.append(
+            asyncio.create_task(token_pool.replenish_forever(db, TOKEN_POOL_REFILL_SECONDS))
+        )
+
+
+def core_warm_up_steps(db):
+    return [("search index", lambda: search_index.build(db))]
+
+
+async def warm_up(steps):
+    """
+    Run (name, async fn) steps one after another, timing each, then log
+    the startup breakdown. A failing step is logged and skipped.
+    """
+    for name, fn in steps:
+        try:
+            with startup_timer.phase(name):
+                await fn()
+        except Exception as e:
+            logger.error(f"❌ Warm-up step '{name}' failed: {e}")
+    startup_timer.since_start("warm")
+    startup_timer.report()
+
+
+async def stop_core_services(db, tasks):
+    """
+    Cancel background loops, write out pending view and quota counts and
+    close the shared HTTP sessions.
+    """
+    for task in tasks:
+        task.cancel()
+    # Let in-flight periodic flushes settle before the final ones
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await view_counter.flush(db)
+    await quota_cache.flush(db)
+    await shortlink_client.close()
+    await close_bot_api_session()
@@ -0,0 +1,110 @@
+# signed_tokens.py
+
+"""
+Stateless verification tokens (VERIFICATION_TOKEN_MODE=signed).
+
+Instead of a verif_tokens row per verification, the /verified link
+carries the user id, an expiry and a nonce, signed with SECRET_KEY:
+
+    <base64url("exp:nonce:user_id")>.<base64url(hmac-sha256[:16])>
+
+Checking one needs no database lookup. A link can be used once: nonces
+seen by /verified are kept in `seen_nonces` until the token would have
+expired anyway. The set lives in process memory, so after a restart (or
+on another worker) an unexpired link could verify the same user again.
+
+    token = sign_token(user_id)
+    claims = read_token(token)  # None if forged / malformed
+"""
+
+import base64
+import hashlib
+import heapq
+import hmac
+import secrets
+import time
+
+from config import SECRET_KEY, VERIFICATION_PERIOD_HOURS, VERIFICATION_NONCE_CACHE_SIZE
+
+_KEY = SECRET_KEY.encode()
+_SIG_BYTES = 16
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload):
+    return hmac.new(_KEY, b"verify:" + payload, hashlib.sha256).digest()[:_SIG_BYTES]
+
+
+def is_signed_token(token):
+    """Signed tokens contain a dot; random db tokens are alphanumeric."""
+    return "." in token
+
+
+def sign_token(user_id, ttl=VERIFICATION_PERIOD_HOURS * 3600):
+    exp = int(time.time() + ttl)
+    nonce = secrets.token_hex(8)
+    payload = f"{exp}:{nonce}:{user_id}".encode()
+    return f"{_b64encode(payload)}.{_b64encode(_sign(payload))}"
+
+
+def read_token(token):
+    """{"user_id", "exp", "nonce"} if the signature is valid, else None (expiry not checked)."""
+    try:
+        payload_part, sig_part = token.split(".", 1)
+        payload = _b64decode(payload_part)
+        sig = _b64decode(sig_part)
+    except ValueError:
+        return None
+    if not hmac.compare_digest(sig, _sign(payload)):
+        return None
+
+    try:
+        exp, nonce, user_id = payload.decode().split(":", 2)
+        return {"user_id": user_id, "exp": int(exp), "nonce": nonce}
+    except ValueError:
+        return None
+
+
+class NonceSet:
+    """Nonces already used, each forgotten once its token has expired."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._expiry = {}  # nonce -> exp
+        self._heap = []  # (exp, nonce), earliest expiry first
+        self.replays = 0
+
+    def __len__(self):
+        return len(self._expiry)
+
+    def _purge(self, now):
+        while self._heap and (self._heap[0][0] <= now or len(self._heap) > self.maxsize):
+            _, nonce = heapq.heappop(self._heap)
+            self._expiry.pop(nonce, None)
+
+    def add(self, nonce, exp):
+        """Record a nonce; False if it was already used."""
+        self._purge(time.time())
+        if nonce in self._expiry:
+            self.replays += 1
+            return False
+        self._expiry[nonce] = exp
+        heapq.heappush(self._heap, (exp, nonce))
+        return True
+
+    def discard(self, nonce):
+        # The heap entry goes away on its own when it expires
+        self._expiry.pop(nonce, None)
+
+    def stats(self):
+        return {"seen": len(self._expiry), "replays": self.replays}
+
+
+seen_nonces = NonceSet(maxsize=VERIFICATION_NONCE_CACHE_SIZE)
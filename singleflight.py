@@ -0,0 +1,74 @@
+# singleflight.py
+
+"""
+Single-flight call coalescing.
+
+While a call for a key is running, other callers with the same key
+await its result instead of issuing the same query again. Useful when a
+new movie is announced and hundreds of users search the same title
+within seconds.
+
+    from singleflight import SingleFlight
+
+    flight = SingleFlight("search")
+    movies = await flight.do(("search", query), lambda: run_query(query))
+"""
+
+import asyncio
+
+# Every group registers itself here so stats can be reported in one place
+_groups = {}
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls per key. Results are not kept once the
+    call finishes; pair with a TTLCache for that.
+    Not thread-safe; meant for a single asyncio event loop.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0  # calls that actually ran
+        self.shared = 0  # callers served by another caller's call (saved DB calls)
+        self.errors = 0
+        self._inflight = {}  # key -> Future of the running call
+        _groups[name] = self
+
+    def __len__(self):
+        return len(self._inflight)
+
+    async def do(self, key, fn):
+        """
+        Return await fn(), sharing one running call per key.
+        If the call raises, every waiter gets the same exception.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            # Own task, so a caller that disconnects doesn't cancel it for everyone
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finished(key, t))
+            self.calls += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    def stats(self):
+        return {
+            "in_flight": len(self._inflight),
+            "calls": self.calls,
+            "saved": self.shared,
+            "errors": self.errors,
+        }
+
+
+def singleflight_stats():
+    """Stats for every single-flight group, keyed by group name."""
+    return {name: g.stats() for name, g in _groups.items()}
@@ -0,0 +1,52 @@
+# startup_timer.py
+
+"""
+Per-phase startup timing.
+
+Imported first by the entry points (main.py, bot.py) so `started` is
+close to process start. Each phase is timed with
+
+    with startup_timer.phase("search index"):
+        await search_index.build(db)
+
+and `report()` logs the breakdown once the last phase (often a
+background warm-up) is done. /admin/cache-stats shows it under
+"startup".
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}  # name -> seconds, in the order they finished
+
+    def record(self, name, seconds):
+        self.phases[name] = round(seconds, 3)
+
+    def since_start(self, name):
+        """Record `name` as the time from process start until now."""
+        self.record(name, time.perf_counter() - self.started)
+
+    @contextmanager
+    def phase(self, name):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - t)
+
+    def report(self):
+        parts = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.phases.items())
+        logger.info(f"⏱️ Startup: {parts} (total {time.perf_counter() - self.started:.2f}s)")
+
+    def stats(self):
+        return dict(self.phases)
+
+
+startup_timer = StartupTimer()
@@ -0,0 +1,250 @@
+# suggest.py
+
+"""
+Search-as-you-type title completions.
+
+A prefix trie over normalized titles where every node keeps its own
+top-K titles by views, so a lookup is one walk down the typed prefix
+and never touches MongoDB. Titles are inserted from each word start,
+so "rul" also completes "Pushpa 2: The Rule".
+
+    from suggest import suggest_index
+
+    await suggest_index.build(db)
+    suggest_index.suggest("pus", limit=8)
+"""
+
+import asyncio
+import logging
+from array import array
+
+from catalog import on_catalog_change
+from search_index import normalize
+
+logger = logging.getLogger(__name__)
+
+# Completions kept per trie node (upper bound for ?limit=)
+SUGGEST_TOP_K = 10
+# Titles inserted between yields to the event loop while (re)building
+_BUILD_CHUNK = 50
+
+
+def _pack(numbers):
+    return array("q", numbers).tobytes()
+
+
+def _unpack(packed):
+    return memoryview(packed).cast("q")
+
+
+class _Nodes:
+    """
+    A trie as flat dicts keyed by integer node ids (0 is the root).
+
+    Every value is an int or bytes (packed arrays of node ids or item
+    numbers), none of which the garbage collector tracks, so neither are
+    the dicts: a trie with ~1M nodes adds next to nothing to a full
+    collection, which would otherwise walk every node while blocking
+    the event loop.
+    """
+
+    __slots__ = ("size", "edges", "children", "tops", "ends", "dirty", "items", "numbers")
+
+    def __init__(self):
+        self.size = 1
+        self.edges = {}  # node << 21 | ord(char) -> child node
+        self.children = {}  # node -> packed child nodes
+        self.tops = {}  # node -> packed item numbers, best first
+        self.ends = {}  # node -> packed items whose title (suffix) ends here
+        self.dirty = set()  # nodes whose top lost an item and must be refilled from below
+        self.items = []  # item number -> (weight, title, str movie_id), None once removed
+        self.numbers = {}  # str movie_id -> item number
+
+    def child(self, node, ch, create=False):
+        key = node << 21 | ord(ch)
+        index = self.edges.get(key)
+        if index is None and create:
+            index = self.edges[key] = self.size
+            self.size += 1
+            self.children[node] = self.children.get(node, b"") + _pack((index,))
+        return index
+
+    def top(self, node):
+        return _unpack(self.tops.get(node, b""))
+
+    def set_top(self, node, numbers, top_k):
+        """Keep the top_k best of some item numbers as the node's top."""
+        items = self.items
+        self.tops[node] = _pack(
+            sorted(numbers, key=lambda n: (-items[n][0], items[n][1]))[:top_k]
+        )
+
+
+class SuggestTrie:
+    def __init__(self, top_k=SUGGEST_TOP_K):
+        self.top_k = top_k
+        self._nodes = _Nodes()
+        self._entries = {}  # movie_id -> (display title, normalized title, weight)
+        self._pending = None  # catalog changes seen while a build runs
+        self._build_lock = asyncio.Lock()
+        self.ready = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    async def build(self, db):
+        """
+        (Re)load titles and view counts from db.movies.
+
+        The new trie is built beside the live one, yielding to the event
+        loop every _BUILD_CHUNK titles, then swapped in. Catalog changes
+        that arrive meanwhile are replayed onto it before the swap.
+        """
+        async with self._build_lock:
+            self._pending = []
+            try:
+                entries = {}
+                cursor = db.movies.find({}, {"title": 1, "views": 1})
+                async for doc in cursor:
+                    title = doc.get("title") or ""
+                    entries[doc["_id"]] = (title, normalize(title), int(doc.get("views") or 0))
+
+                nodes = _Nodes()
+                for i, (movie_id, entry) in enumerate(entries.items(), 1):
+                    self._insert(nodes, movie_id, entry)
+                    if i % _BUILD_CHUNK == 0:
+                        await asyncio.sleep(0)
+                pending = self._pending
+            finally:
+                self._pending = None
+
+            self._nodes, self._entries = nodes, entries
+            for op, movie in pending:
+                if op == "insert":
+                    self.add_movie(movie)
+                else:
+                    self.remove_movie(movie["_id"])
+            self.ready = True
+            logger.info(f"✅ Suggest trie built: {len(self)} titles")
+
+    async def refresh_forever(self, db, interval):
+        """Rebuild every `interval` seconds so view weights stay current."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.build(db)
+            except Exception as e:
+                logger.error(f"❌ Suggest trie refresh failed: {e}")
+
+    def add_movie(self, movie):
+        if self._pending is not None:
+            self._pending.append(("insert", movie))
+        movie_id = movie["_id"]
+        old = self._entries.pop(movie_id, None)
+        if old is not None:
+            self._remove(movie_id, old)
+        title = movie.get("title") or ""
+        entry = (title, normalize(title), int(movie.get("views") or 0))
+        self._entries[movie_id] = entry
+        self._insert(self._nodes, movie_id, entry)
+
+    def remove_movie(self, movie_id):
+        if self._pending is not None:
+            self._pending.append(("delete", {"_id": movie_id}))
+        entry = self._entries.pop(movie_id, None)
+        if entry is not None:
+            self._remove(movie_id, entry)
+
+    def _paths(self, nodes, normalized, create):
+        """Nodes on the path of every word-start suffix, each node once."""
+        seen = set()
+        words = normalized.split()
+        for start in range(len(words)):
+            node = 0
+            for ch in " ".join(words[start:]):
+                node = nodes.child(node, ch, create)
+                if node is None:
+                    break
+                if node not in seen:
+                    seen.add(node)
+                    yield node, False
+            else:
+                if node:
+                    yield node, True
+
+    def _insert(self, nodes, movie_id, entry):
+        title, normalized, weight = entry
+        number = len(nodes.items)
+        nodes.items.append((weight, title, str(movie_id)))
+        nodes.numbers[str(movie_id)] = number
+        for node, is_end in self._paths(nodes, normalized, create=True):
+            if is_end:
+                nodes.ends[node] = nodes.ends.get(node, b"") + _pack((number,))
+            else:
+                self._offer(nodes, node, number)
+
+    def _remove(self, movie_id, entry):
+        """
+        Take an entry out of every top list on its paths. A full list that
+        loses an item is only marked dirty; it is refilled from its
+        children on the next lookup that reaches it (_refill).
+        """
+        nodes = self._nodes
+        number = nodes.numbers.pop(str(movie_id), None)
+        if number is None:
+            return
+        nodes.items[number] = None
+        for node, is_end in self._paths(nodes, entry[1], create=False):
+            if is_end:
+                ends = _unpack(nodes.ends.get(node, b""))
+                if number in ends:
+                    nodes.ends[node] = _pack(n for n in ends if n != number)
+                continue
+            top = nodes.top(node)
+            if number in top:
+                if len(top) >= self.top_k:
+                    nodes.dirty.add(node)
+                nodes.tops[node] = _pack(n for n in top if n != number)
+
+    def _refill(self, nodes, node):
+        # A clean node's top is correct whatever lies below it
+        if node not in nodes.dirty:
+            return
+        best = set(_unpack(nodes.ends.get(node, b"")))
+        for child in _unpack(nodes.children.get(node, b"")):
+            self._refill(nodes, child)
+            best.update(nodes.top(child))
+        nodes.set_top(node, best, self.top_k)
+        nodes.dirty.discard(node)
+
+    def _offer(self, nodes, node, number):
+        top = nodes.top(node)
+        if len(top) >= self.top_k and nodes.items[number][0] <= nodes.items[top[-1]][0]:
+            return
+        nodes.set_top(node, [*top, number], self.top_k)
+
+    def suggest(self, prefix, limit=SUGGEST_TOP_K):
+        """Return [{"id", "title"}] for titles matching prefix, most viewed first."""
+        nodes = self._nodes
+        node = 0
+        for ch in normalize(prefix):
+            node = nodes.child(node, ch)
+            if node is None:
+                return []
+        self._refill(nodes, node)
+        result = []
+        for number in nodes.top(node)[:limit]:
+            _, title, movie_id = nodes.items[number]
+            result.append({"id": movie_id, "title": title})
+        return result
+
+
+suggest_index = SuggestTrie()
+
+
+@on_catalog_change
+def _sync_suggest_index(op, movie):
+    if op == "insert":
+        suggest_index.add_movie(movie)
+    elif op == "delete":
+        suggest_index.remove_movie(movie["_id"])
@@ -0,0 +1,145 @@
+"""
+Daily quota checks against a real MongoDB (update pipelines and $type
+are not supported by mongomock).
+
+    MONGO_TEST_URI=mongodb://localhost:27017 python -m pytest tests
+
+Skipped when no server answers and MONGO_TEST_URI is unset (CI sets it,
+so there a missing server fails the run).
+"""
+
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+for name, value in {
+    "BOT_TOKEN": "1:test",
+    "API_ID": "1",
+    "API_HASH": "test",
+    "ADMIN_IDS": "1",
+    "VERIFICATION_ON": "true",
+    "VERIFICATION_FREE_LIMIT": "3",
+}.items():
+    os.environ.setdefault(name, value)
+
+from bson import ObjectId  # noqa: E402
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+from pymongo.errors import ServerSelectionTimeoutError  # noqa: E402
+
+import verification_checker  # noqa: E402
+from verification_checker import (  # noqa: E402
+    check_user_access,
+    quota_cache,
+    _today_reset_time,
+)
+
+MONGO_TEST_URI = os.getenv("MONGO_TEST_URI", "mongodb://localhost:27017")
+LIMIT = verification_checker.VERIFICATION_FREE_LIMIT
+RESET = _today_reset_time()
+
+
+@pytest.fixture(autouse=True)
+def fixed_reset_time(monkeypatch):
+    # A test running across the daily reset would otherwise see two days
+    monkeypatch.setattr(verification_checker, "_today_reset_time", lambda: RESET)
+
+
+def run(test):
+    """Run `await test(db)` on a fresh database, skipping without a server."""
+
+    async def main():
+        client = AsyncIOMotorClient(MONGO_TEST_URI, serverSelectionTimeoutMS=1000)
+        try:
+            await client.admin.command("ping")
+        except ServerSelectionTimeoutError:
+            if "MONGO_TEST_URI" in os.environ:
+                raise
+            pytest.skip(f"no MongoDB at {MONGO_TEST_URI}")
+
+        db = client[f"test_quota_{ObjectId()}"]
+        await db.verif_users.create_index("user_id", unique=True)
+        quota_cache.reset()
+        try:
+            await test(db)
+        finally:
+            await client.drop_database(db.name)
+            client.close()
+
+    asyncio.run(main())
+
+
+def test_parallel_checks_allow_exactly_the_limit():
+    async def test(db):
+        results = await asyncio.gather(
+            *(check_user_access("42", db) for _ in range(LIMIT * 5))
+        )
+        assert sum(r["allowed"] for r in results) == LIMIT
+        assert all(r["need_verification"] for r in results if not r["allowed"])
+
+        row = await db.verif_users.find_one({"user_id": "42"})
+        assert row["count"] == LIMIT
+
+        # Later checks (cached or not) never hand out more
+        results = await asyncio.gather(*(check_user_access("42", db) for _ in range(10)))
+        assert not any(r["allowed"] for r in results)
+
+    run(test)
+
+
+def test_first_checks_of_new_users_race_on_insert():
+    async def test(db):
+        users = [str(n) for n in range(20)]
+        results = await asyncio.gather(
+            *(check_user_access(uid, db) for uid in users for _ in range(3))
+        )
+        assert sum(r["allowed"] for r in results) == len(users) * min(3, LIMIT)
+        assert await db.verif_users.count_documents({}) == len(users)
+
+    run(test)
+
+
+def test_stale_row_is_reset_before_counting():
+    async def test(db):
+        yesterday = RESET - timedelta(days=1)
+        await db.verif_users.insert_many(
+            [
+                {"user_id": "old", "count": LIMIT, "verified": True, "last_reset": yesterday},
+                # last_reset written as a string by an old version: not a date, so stale
+                {"user_id": "str", "count": LIMIT, "verified": False, "last_reset": "2020-01-01"},
+            ]
+        )
+
+        for uid in ("old", "str"):
+            result = await check_user_access(uid, db)
+            assert result["allowed"]
+            assert result["count"] == 1
+            assert result["reason"] == "First visit today"
+
+            row = await db.verif_users.find_one({"user_id": uid})
+            assert row["verified"] is False
+            assert row["last_reset"].replace(tzinfo=timezone.utc) == RESET
+
+    run(test)
+
+
+def test_verified_user_is_allowed_without_counting():
+    async def test(db):
+        await db.verif_users.insert_one(
+            {
+                "user_id": "v",
+                "count": LIMIT,
+                "verified": True,
+                "last_reset": RESET,
+                "last_verified": datetime.now(timezone.utc),
+            }
+        )
+
+        results = await asyncio.gather(*(check_user_access("v", db) for _ in range(5)))
+        assert all(r["allowed"] and r["reason"] == "Already verified" for r in results)
+
+        row = await db.verif_users.find_one({"user_id": "v"})
+        assert row["count"] == LIMIT
+
+    run(test)
@@ -0,0 +1,249 @@
+# token_pool.py
+
+"""
+Pool of pre-minted verification tokens.
+
+A user who hits the free limit used to wait for a live shortlink API
+call before seeing the "Verify" button. The pool keeps tokens whose
+shortlink is already created and whose verif_tokens row is already
+inserted, not yet bound to anyone:
+
+    {"user_id": None, "token": ..., "shortlink": ..., "expires": ...}
+
+Their shortlink points at /verified?token=... (no uid). Handing one out
+pops it from a deque and binds the row to the user with one atomic
+update, so two processes can never give the same token to two users.
+
+- The replenisher mints tokens up to TOKEN_POOL_HIGH once fewer than
+  TOKEN_POOL_LOW are left (and tops up every TOKEN_POOL_REFILL_SECONDS).
+- Rows are removed by the verif_tokens TTL index when they expire, so
+  pooled tokens close to expiry are recycled: their expiry is pushed
+  back instead of paying for a new shortlink.
+- Unbound rows left by a previous run (or another worker) are loaded
+  at startup.
+- With an empty pool (or while the shortlink provider is down) a token
+  is made for the user on the spot, as before.
+
+With VERIFICATION_TOKEN_MODE=signed tokens carry the user id
+(signed_tokens.py), so none are pooled and issue() signs one per call.
+
+    from token_pool import token_pool
+
+    shortlink_url = await token_pool.issue(user_id, db)
+"""
+
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timedelta
+
+from config import (
+    BASE_URL,
+    VERIFICATION_PERIOD_HOURS,
+    VERIFICATION_TOKEN_MODE,
+    TOKEN_POOL_LOW,
+    TOKEN_POOL_HIGH,
+    TOKEN_POOL_MIN_TTL_MINUTES,
+)
+from signed_tokens import sign_token
+from verification import create_universal_shortlink, generate_verify_token
+
+logger = logging.getLogger(__name__)
+
+
+def _expiry():
+    return datetime.utcnow() + timedelta(hours=VERIFICATION_PERIOD_HOURS)
+
+
+class TokenPool:
+    def __init__(self, low, high, min_ttl_minutes):
+        self.low = low
+        self.high = high
+        self.min_ttl = timedelta(minutes=min_ttl_minutes)
+        self._ready = deque()  # (token, shortlink, expires)
+        self._low = asyncio.Event()
+        self.handed_out = 0
+        self.misses = 0  # pool empty, token made on the spot
+        self.minted = 0
+        self.mint_failures = 0
+        self.recycled = 0
+        self.expired = 0  # dropped: past expiry or row already gone
+        self.lost = 0  # row bound elsewhere or removed before handout
+
+    def __len__(self):
+        return len(self._ready)
+
+    @property
+    def enabled(self):
+        return self.high > 0
+
+    # ---------- handout ----------
+
+    async def issue(self, user_id, db):
+        """Shortlink URL that verifies `user_id`: a pooled one if available."""
+        if VERIFICATION_TOKEN_MODE == "signed":
+            redirect_url = f"{BASE_URL}/verified?token={sign_token(user_id)}"
+            return await create_universal_shortlink(redirect_url) or redirect_url
+
+        now = datetime.utcnow()
+        while self._ready:
+            token, shortlink, expires = self._ready.popleft()
+            if len(self._ready) < self.low:
+                self._low.set()
+            if expires <= now:
+                self.expired += 1
+                continue
+
+            result = await db.verif_tokens.update_one(
+                {"token": token, "user_id": None},
+                {"$set": {"user_id": str(user_id), "expires": _expiry()}},
+            )
+            if result.modified_count:
+                self.handed_out += 1
+                return shortlink
+            self.lost += 1
+
+        if self.enabled:
+            self.misses += 1
+            self._low.set()
+        return await self._issue_direct(user_id, db)
+
+    async def _issue_direct(self, user_id, db):
+        verify_token = generate_verify_token()
+        redirect_url = f"{BASE_URL}/verified?uid={user_id}&token={verify_token}"
+        shortlink_url = await create_universal_shortlink(redirect_url) or redirect_url
+
+        await db.verif_tokens.insert_one(
+            {
+                "user_id": str(user_id),
+                "token": verify_token,
+                "created": datetime.utcnow(),
+                "expires": _expiry(),
+            }
+        )
+        return shortlink_url
+
+    # ---------- replenisher ----------
+
+    async def _mint(self, db):
+        """Add one unbound token to the pool. False if no shortlink could be made."""
+        token = generate_verify_token()
+        shortlink = await create_universal_shortlink(f"{BASE_URL}/verified?token={token}")
+        if not shortlink:
+            self.mint_failures += 1
+            return False
+
+        expires = _expiry()
+        await db.verif_tokens.insert_one(
+            {
+                "user_id": None,
+                "token": token,
+                "shortlink": shortlink,
+                "created": datetime.utcnow(),
+                "expires": expires,
+            }
+        )
+        self._ready.append((token, shortlink, expires))
+        self.minted += 1
+        return True
+
+    async def load(self, db):
+        """Pick up unbound tokens left in verif_tokens."""
+        cursor = db.verif_tokens.find(
+            {
+                "user_id": None,
+                "shortlink": {"$exists": True},
+                "expires": {"$gt": datetime.utcnow() + self.min_ttl},
+            },
+            {"token": 1, "shortlink": 1, "expires": 1},
+        ).limit(self.high)
+        known = {token for token, _, _ in self._ready}
+        async for row in cursor:
+            if row["token"] not in known:
+                self._ready.append((row["token"], row["shortlink"], row["expires"]))
+        if self._ready:
+            logger.info(f"🎟️ Token pool: {len(self._ready)} tokens loaded")
+
+    async def recycle(self, db):
+        """Push back the expiry of pooled tokens about to expire."""
+        soon = datetime.utcnow() + self.min_ttl
+        stale = [token for token, _, expires in self._ready if expires <= soon]
+        if not stale:
+            return
+
+        expires = _expiry()
+        await db.verif_tokens.update_many(
+            {"token": {"$in": stale}, "user_id": None},
+            {"$set": {"expires": expires}},
+        )
+        # Rows already removed (TTL) or bound by another worker are dropped
+        alive = {
+            row["token"]
+            async for row in db.verif_tokens.find(
+                {"token": {"$in": stale}, "user_id": None}, {"token": 1}
+            )
+        }
+
+        stale = set(stale)
+        kept = deque()
+        for token, shortlink, old_expires in self._ready:
+            if token not in stale:
+                kept.append((token, shortlink, old_expires))
+            elif token in alive:
+                kept.append((token, shortlink, expires))
+                self.recycled += 1
+            else:
+                self.expired += 1
+        self._ready = kept
+
+    async def fill(self, db):
+        """Mint tokens up to the high watermark (stops if the provider fails)."""
+        before = len(self._ready)
+        while len(self._ready) < self.high:
+            if not await self._mint(db):
+                logger.warning(
+                    f"⚠️ Token pool: shortlink failed, {len(self._ready)} tokens ready"
+                )
+                break
+        if len(self._ready) > before:
+            logger.info(f"🎟️ Token pool: {len(self._ready) - before} tokens minted")
+
+    async def replenish_forever(self, db, interval):
+        """Keep the pool between the watermarks until cancelled."""
+        try:
+            await self.load(db)
+        except Exception as e:
+            logger.error(f"❌ Token pool load failed: {e}")
+
+        while True:
+            self._low.clear()
+            try:
+                await self.recycle(db)
+                if len(self._ready) < self.low or not self._ready:
+                    await self.fill(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Token pool refill failed: {e}")
+
+            try:
+                await asyncio.wait_for(self._low.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self):
+        return {
+            "ready": len(self._ready),
+            "low": self.low,
+            "high": self.high,
+            "handed_out": self.handed_out,
+            "misses": self.misses,
+            "minted": self.minted,
+            "mint_failures": self.mint_failures,
+            "recycled": self.recycled,
+            "expired": self.expired,
+            "lost": self.lost,
+        }
+
+
+token_pool = TokenPool(TOKEN_POOL_LOW, TOKEN_POOL_HIGH, TOKEN_POOL_MIN_TTL_MINUTES)
@@ -0,0 +1,177 @@
+# trending.py
+
+"""
+Time-decayed trending scores.
+
+Every view adds exp(λ·(t - t0)) to the movie's score ("forward decay"),
+with λ = ln 2 / TRENDING_HALF_LIFE_HOURS. Comparing these scores is the
+same as comparing exponentially decayed view counts, but a score never
+has to be touched again once written, so it can be updated in O(1) and
+only ever grows - which lets a small min-heap hold the current top-N.
+
+Views are persisted as hourly counts in db.view_buckets by the view
+counter; `load` rebuilds the scores from the last TRENDING_WINDOW_HOURS
+of buckets at startup and periodically, so every worker sees views
+recorded by the others.
+
+    from trending import trending
+
+    trending.record(movie_id)
+    trending.top(10)  # [(movie_id, score), ...]
+"""
+
+import asyncio
+import heapq
+import logging
+import math
+import time
+from datetime import datetime, timedelta
+
+from catalog import on_catalog_change
+from config import TRENDING_HALF_LIFE_HOURS, TRENDING_TOP_N
+
+logger = logging.getLogger(__name__)
+
+# Rebase scores before exp() gets anywhere near float overflow
+_MAX_EXPONENT = 50.0
+
+
+def current_hour(now=None):
+    """Start of the UTC hour bucket for `now` (naive UTC datetime)."""
+    now = now or datetime.utcnow()
+    return now.replace(minute=0, second=0, microsecond=0)
+
+
+class TrendingScores:
+    def __init__(self, half_life_hours=24, top_n=50):
+        self.decay = math.log(2) / (half_life_hours * 3600)
+        self.top_n = top_n
+        self._t0 = time.time()
+        self._scores = {}  # movie_id -> forward-decayed score
+        self._top = {}  # movie_id -> score, for heap members only
+        self._heap = []  # (score, movie_id); may hold stale entries
+
+    # ---------- scoring ----------
+
+    def _weight(self, ts):
+        exponent = self.decay * (ts - self._t0)
+        if exponent > _MAX_EXPONENT:
+            self._rebase(ts)
+            exponent = 0.0
+        return math.exp(exponent)
+
+    def _rebase(self, ts):
+        """Move t0 to `ts`, scaling every score down by the same factor."""
+        factor = math.exp(-self.decay * (ts - self._t0))
+        self._t0 = ts
+        self._scores = {mid: s * factor for mid, s in self._scores.items()}
+        self._rebuild_top()
+
+    def record(self, movie_id, n=1, ts=None):
+        """Add `n` views at unix time `ts` (default: now)."""
+        ts = time.time() if ts is None else ts
+        score = self._scores.get(movie_id, 0.0) + n * self._weight(ts)
+        self._scores[movie_id] = score
+        self._offer(movie_id, score)
+
+    # ---------- top-N heap ----------
+
+    def _peek_min(self):
+        heap = self._heap
+        while heap and self._top.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)  # stale entry
+        return heap[0]
+
+    def _offer(self, movie_id, score):
+        if movie_id in self._top:
+            self._top[movie_id] = score
+            heapq.heappush(self._heap, (score, movie_id))
+        elif len(self._top) < self.top_n:
+            self._top[movie_id] = score
+            heapq.heappush(self._heap, (score, movie_id))
+        elif score > self._peek_min()[0]:
+            _, evicted = heapq.heappop(self._heap)
+            del self._top[evicted]
+            self._top[movie_id] = score
+            heapq.heappush(self._heap, (score, movie_id))
+
+        # Scores only grow, so updated members leave stale entries behind
+        if len(self._heap) > 4 * self.top_n:
+            self._heap = [(s, mid) for mid, s in self._top.items()]
+            heapq.heapify(self._heap)
+
+    def _rebuild_top(self):
+        best = heapq.nlargest(self.top_n, self._scores.items(), key=lambda item: item[1])
+        self._top = dict(best)
+        self._heap = [(s, mid) for mid, s in best]
+        heapq.heapify(self._heap)
+
+    def remove(self, movie_id):
+        self._scores.pop(movie_id, None)
+        if self._top.pop(movie_id, None) is not None:
+            self._rebuild_top()
+
+    def top(self, limit=None):
+        """Current [(movie_id, score)] best first; scores are relative to now."""
+        now_factor = math.exp(-self.decay * (time.time() - self._t0))
+        ranked = sorted(self._top.items(), key=lambda item: -item[1])
+        return [(mid, s * now_factor) for mid, s in ranked[:limit]]
+
+    # ---------- persistence ----------
+
+    async def load(self, db, window_hours=168):
+        """
+        Rebuild every score from the hourly buckets of the last
+        `window_hours`, plus this process's views not flushed to
+        view_buckets yet. Views recorded while loading are in those
+        pending counts, so the new scores replace the old ones at once.
+        """
+        # view_counter imports this module
+        from view_counter import view_counter
+
+        since = current_hour() - timedelta(hours=window_hours)
+        t0 = time.time()
+        scores = {}
+
+        def add(movie_id, hour, views):
+            # Credit the views to the middle of their hour
+            ts = (hour + timedelta(minutes=30) - datetime(1970, 1, 1)).total_seconds()
+            scores[movie_id] = scores.get(movie_id, 0.0) + views * math.exp(self.decay * (ts - t0))
+
+        cursor = db.view_buckets.find({"hour": {"$gte": since}})
+        async for bucket in cursor:
+            add(bucket["movie_id"], bucket["hour"], bucket["views"])
+        for (movie_id, hour), views in view_counter.pending_hours().items():
+            add(movie_id, hour, views)
+
+        self._t0, self._scores = t0, scores
+        self._rebuild_top()
+        logger.info(f"✅ Trending scores loaded: {len(self._scores)} movies")
+
+    async def reload_forever(self, db, interval, window_hours=168):
+        """Reload from view_buckets every `interval` seconds."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.load(db, window_hours)
+            except Exception as e:
+                logger.error(f"❌ Trending reload failed: {e}")
+
+
+trending = TrendingScores(TRENDING_HALF_LIFE_HOURS, TRENDING_TOP_N)
+
+
+@on_catalog_change
+def _drop_deleted_movie(op, movie):
+    if op == "delete":
+        trending.remove(movie["_id"])
+
+
+async def load_trending_movies(db, limit, projection=None):
+    """Documents for the current top `limit` trending movies, best first."""
+    ids = [movie_id for movie_id, _ in trending.top(limit)]
+    if not ids:
+        return []
+    docs = await db.movies.find({"_id": {"$in": ids}}, projection).to_list(length=len(ids))
+    by_id = {doc["_id"]: doc for doc in docs}
+    return [by_id[movie_id] for movie_id in ids if movie_id in by_id]
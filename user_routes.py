@@ -1,27 +1,39 @@
 from fastapi import Request, Query, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from typing import Optional
-from bson import ObjectId
 import urllib.parse
-from datetime import datetime, timedelta
 
 from database import get_database
+from repository import get_movie_repository, to_object_id
+from cache import query_cache
+from search_index import search_index
+from suggest import suggest_index, SUGGEST_TOP_K
+from homepage import homepage_snapshot
+from page_cache import page_cache
+from trending import trending
+from pagination import (
+    PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    encode_id_cursor,
+    decode_id_cursor,
+    encode_search_cursor,
+    decode_search_cursor,
+)
 from config import REQUEST_GROUP
 
 # NEW: imports for verification
 from config import (
-    BASE_URL,
     VERIFICATION_TUTORIAL_LINK,
     VERIFICATION_TUTORIAL_NAME,
-    VERIFICATION_PERIOD_HOURS,
 )
 
 from verification_checker import check_user_access
-from verification import create_universal_shortlink, generate_verify_token
+from token_pool import token_pool
 
 templates = Jinja2Templates(directory="templates")
 db = get_database()
+movies_repo = get_movie_repository()
 
 # ============================================
 # HOMEPAGE
@@ -29,42 +41,23 @@ db = get_database()
 
 
 async def homepage(request: Request):
-    """Main homepage with all sections"""
-    latest_movies = (
-        await db.movies.find()
-        .sort("_id", -1)
-        .limit(10)
-        .to_list(length=10)
-    )
-    trending_movies = (
-        await db.movies.find()
-        .sort("views", -1)
-        .limit(10)
-        .to_list(length=10)
-    )
-    tamil_movies = (
-        await db.movies.find({"language": "Tamil"})
-        .sort("_id", -1)
-        .limit(10)
-        .to_list(length=10)
-    )
-    hindi_movies = (
-        await db.movies.find({"language": "Hindi"})
-        .sort("_id", -1)
-        .limit(10)
-        .to_list(length=10)
-    )
-
-    return templates.TemplateResponse(
-        "index.html",
-        {
-            "request": request,
-            "latest_movies": latest_movies,
-            "trending_movies": trending_movies,
-            "tamil_movies": tamil_movies,
-            "hindi_movies": hindi_movies,
-            "request_group": REQUEST_GROUP,
-        },
+    """Main homepage with all sections (rendered from the in-memory snapshot)"""
+    if homepage_snapshot.sections is None:
+        await homepage_snapshot.refresh(db)
+    sections = homepage_snapshot.sections
+
+    return await page_cache.respond(
+        request,
+        "homepage",
+        lambda: templates.TemplateResponse(
+            "index.html",
+            {
+                "request": request,
+                **sections,
+                "request_group": REQUEST_GROUP,
+            },
+        ),
+        version=homepage_snapshot.generation,
     )
 
 
@@ -75,7 +68,7 @@ async def homepage(request: Request):
 
 async def movie_detail(request: Request, movie_id: str):
     """Movie detail page with player"""
-    movie = await db.movies.find_one({"_id": ObjectId(movie_id)})
+    movie = await movies_repo.get_by_id(movie_id)
     if not movie:
         return HTMLResponse("Movie not found", status_code=404)
 
@@ -84,23 +77,11 @@ async def movie_detail(request: Request, movie_id: str):
 
     access = await check_user_access(user_id, db)
     if not access["allowed"] and access["need_verification"]:
-        # Generate verification token + shortlink
-        verify_token = generate_verify_token()
-        redirect_url = f"{BASE_URL}/verified?uid={user_id}&token={verify_token}"
-        shortlink_url = create_universal_shortlink(redirect_url)
-
-        await db.verif_tokens.insert_one(
-            {
-                "user_id": str(user_id),
-                "token": verify_token,
-                "created": datetime.utcnow(),
-                "expires": datetime.utcnow()
-                + timedelta(hours=VERIFICATION_PERIOD_HOURS),
-            }
-        )
+        # Verification token + shortlink (pre-minted when the pool has one)
+        shortlink_url = await token_pool.issue(user_id, db)
 
         return templates.TemplateResponse(
-            "verify_page.html",
+            "verification_page.html",
             {
                 "request": request,
                 "shortlink_url": shortlink_url,
@@ -109,13 +90,20 @@ async def movie_detail(request: Request, movie_id: str):
             },
         )
 
+    movies_repo.increment_views(movie.id)
+
     # If allowed, render movie detail page
-    return templates.TemplateResponse(
-        "movie_detail.html",
-        {
-            "request": request,
-            "movie": movie,
-        },
+    return await page_cache.respond(
+        request,
+        "movie_detail",
+        lambda: templates.TemplateResponse(
+            "movie_detail.html",
+            {
+                "request": request,
+                "movie": movie,
+            },
+        ),
+        private=True,
     )
 
 
@@ -126,37 +114,25 @@ async def movie_detail(request: Request, movie_id: str):
 
 async def watch_movie(request: Request, movie_id: str):
     """Redirect user to the movie watch/stream link."""
-    movie = await db.movies.find_one({"_id": ObjectId(movie_id)})
-    if not movie:
+    found, watch_link = await movies_repo.get_link(movie_id, "watch")
+    if not found:
         raise HTTPException(status_code=404, detail="Movie not found")
-
-    # Try multiple possible field names
-    watch_link = (
-        movie.get("watch_link")
-        or movie.get("watch_url")
-        or movie.get("stream_link")
-        or movie.get("lulu_link")
-    )
     if not watch_link:
         raise HTTPException(
             status_code=404,
             detail="Watch link not configured for this movie",
         )
 
+    movies_repo.increment_views(to_object_id(movie_id))
+
     return RedirectResponse(url=watch_link, status_code=302)
 
 
 async def download_movie(request: Request, movie_id: str):
     """Redirect user to the movie download link."""
-    movie = await db.movies.find_one({"_id": ObjectId(movie_id)})
-    if not movie:
+    found, download_link = await movies_repo.get_link(movie_id, "download")
+    if not found:
         raise HTTPException(status_code=404, detail="Movie not found")
-
-    download_link = (
-        movie.get("download_link")
-        or movie.get("download_url")
-        or movie.get("ht_link")
-    )
     if not download_link:
         raise HTTPException(
             status_code=404,
@@ -171,61 +147,145 @@ async def download_movie(request: Request, movie_id: str):
 # ============================================
 
 
-async def search_movies(request: Request, q: str = Query("")):
-    """Search movies"""
+async def search_movies(
+    request: Request,
+    q: str = Query(""),
+    after: Optional[str] = Query(None),
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    """Search movies (paged with ?after= cursors)"""
     if not q:
         return RedirectResponse("/")
 
-    # Search in database (title, case-insensitive)
-    movies = await db.movies.find(
-        {"title": {"$regex": q, "$options": "i"}}
-    ).to_list(length=50)
+    try:
+        after_key = decode_search_cursor(after) if after else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid page cursor")
+
+    async def render():
+        # Ranked title search from the in-memory index
+        movies, next_after = await movies_repo.search(q, limit=limit, after=after_key)
+
+        if not movies and after_key is None:
+            # No results - show request page
+            return templates.TemplateResponse(
+                "search_no_results.html",
+                {
+                    "request": request,
+                    "query": q,
+                    "request_url": f"{REQUEST_GROUP}?text=🎬 Movie Request: {urllib.parse.quote(q)}",
+                },
+            )
+
+        next_url = None
+        if next_after:
+            next_url = "/search?" + urllib.parse.urlencode(
+                {"q": q, "after": encode_search_cursor(next_after), "limit": limit}
+            )
 
-    if not movies:
-        # No results - show request page
         return templates.TemplateResponse(
-            "search_no_results.html",
+            "search_results.html",
             {
                 "request": request,
                 "query": q,
-                "request_url": f"{REQUEST_GROUP}?text=🎬 Movie Request: {urllib.parse.quote(q)}",
+                "movies": movies,
+                "count": len(movies),
+                "next_url": next_url,
             },
         )
 
-    return templates.TemplateResponse(
-        "search_results.html",
-        {
-            "request": request,
-            "query": q,
-            "movies": movies,
-            "count": len(movies),
-        },
+    if not search_index.ready:
+        # Regex fallback results: never cache or let browsers keep them
+        response = await render()
+        response.headers["Cache-Control"] = "no-store"
+        return response
+
+    return await page_cache.respond(request, "search_movies", render)
+
+
+# ============================================
+# AUTOCOMPLETE (JSON)
+# ============================================
+
+
+async def suggest_titles(q: str = Query(""), limit: int = Query(8, ge=1, le=SUGGEST_TOP_K)):
+    """Title completions for the search box, served from memory"""
+    return JSONResponse(
+        {"query": q, "suggestions": suggest_index.suggest(q, limit=limit)}
     )
 
 
+# ============================================
+# TRENDING (JSON)
+# ============================================
+
+
+async def trending_movies(limit: int = Query(10, ge=1, le=50)):
+    """Top trending movies by time-decayed views"""
+    key = ("trending", limit)
+    items = query_cache.get(key)
+    if items is None:
+        scores = trending.top(limit)
+        movies = await movies_repo.get_many([movie_id for movie_id, _ in scores])
+        scores = dict(scores)
+        items = [
+            {
+                "id": str(movie.id),
+                "title": movie.title,
+                "year": movie.year,
+                "language": movie.language,
+                "score": round(scores.get(movie.id, 0.0), 3),
+            }
+            for movie in movies
+        ]
+        query_cache.set(key, items, ttl=30)
+    return JSONResponse({"movies": items})
+
+
 # ============================================
 # BROWSE BY LANGUAGE
 # ============================================
 
 
-async def browse_language(request: Request, language: str):
-    """Browse movies by language"""
-    movies = (
-        await db.movies.find({"language": language})
-        .sort("_id", -1)
-        .to_list(length=100)
-    )
+async def _browse_page(request, route, field, value, title, filter_type, after, limit):
+    try:
+        after_id = decode_id_cursor(after) if after else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid page cursor")
 
-    return templates.TemplateResponse(
-        "browse.html",
-        {
-            "request": request,
-            "title": f"{language} Movies",
-            "movies": movies,
-            "count": len(movies),
-            "filter_type": "language",
-            "filter_value": language,
-        },
+    async def render():
+        movies, next_after = await movies_repo.list_by(field, value, limit, after_id)
+        next_url = None
+        if next_after:
+            next_url = "?" + urllib.parse.urlencode(
+                {"after": encode_id_cursor(next_after), "limit": limit}
+            )
+        return templates.TemplateResponse(
+            "browse.html",
+            {
+                "request": request,
+                "title": title,
+                "movies": movies,
+                "count": len(movies),
+                "filter_type": filter_type,
+                "filter_value": value,
+                "next_url": next_url,
+            },
+        )
+
+    return await page_cache.respond(request, route, render)
+
+
+async def browse_language(
+    request: Request,
+    language: str,
+    after: Optional[str] = Query(None),
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    """Browse movies by language"""
+    return await _browse_page(
+        request, "browse_language", "language", language,
+        f"{language} Movies", "language", after, limit,
     )
 
 
@@ -234,22 +294,14 @@ async def browse_language(request: Request, language: str):
 # ============================================
 
 
-async def browse_genre(request: Request, genre: str):
+async def browse_genre(
+    request: Request,
+    genre: str,
+    after: Optional[str] = Query(None),
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
     """Browse movies by genre"""
-    movies = (
-        await db.movies.find({"genres": genre})
-        .sort("_id", -1)
-        .to_list(length=100)
-    )
-
-    return templates.TemplateResponse(
-        "browse.html",
-        {
-            "request": request,
-            "title": f"{genre} Movies",
-            "movies": movies,
-            "count": len(movies),
-            "filter_type": "genre",
-            "filter_value": genre,
-        },
+    return await _browse_page(
+        request, "browse_genre", "genres", genre,
+        f"{genre} Movies", "genre", after, limit,
     )
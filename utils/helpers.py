@@ -1,84 +1,125 @@
-import aiohttp
 import asyncio
-from config import BOT_TOKEN
+import logging
+import random
 
-async def send_message(chat_id, text, parse_mode="Markdown"):
-    """Send text message - WITH RETRY"""
-    for attempt in range(2):  # Try twice
+from config import (
+    BOT_TOKEN,
+    TELEGRAM_API_CONNECTIONS,
+    TELEGRAM_API_TIMEOUT,
+    TELEGRAM_API_ATTEMPTS,
+)
+
+logger = logging.getLogger(__name__)
+
+# One keep-alive session for every Bot API call (created on first use,
+# closed by close_session() on shutdown)
+_session = None
+
+# Retry delays: random between 0 and min(cap, base * 2**attempt) seconds
+_BACKOFF_BASE = 0.5
+_BACKOFF_CAP = 10
+
+
+def _get_session():
+    # aiohttp is imported on the first call, not at startup
+    import aiohttp
+
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=TELEGRAM_API_CONNECTIONS,
+                keepalive_timeout=60,
+                ttl_dns_cache=300,
+            ),
+            timeout=aiohttp.ClientTimeout(total=TELEGRAM_API_TIMEOUT),
+        )
+    return _session
+
+
+def _backoff(attempt):
+    return random.uniform(0, min(_BACKOFF_CAP, _BACKOFF_BASE * 2 ** attempt))
+
+
+async def _call(method, payload, timeout=None):
+    """POST a Bot API method - WITH RETRY (jittered backoff, honors retry_after)"""
+    import aiohttp
+
+    # timeout=None would disable the session's TELEGRAM_API_TIMEOUT: only pass overrides
+    options = {"timeout": aiohttp.ClientTimeout(total=timeout)} if timeout else {}
+    for attempt in range(TELEGRAM_API_ATTEMPTS):
+        delay = _backoff(attempt)
         try:
-            timeout = aiohttp.ClientTimeout(total=30)  # Increased to 30 seconds
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(
-                    f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage",
-                    json={
-                        "chat_id": chat_id,
-                        "text": text,
-                        "parse_mode": parse_mode
-                    }
-                ) as response:
-                    result = await response.json()
-                    print(f"✅ Message sent ({response.status})")
+            async with _get_session().post(
+                f"https://api.telegram.org/bot{BOT_TOKEN}/{method}",
+                json=payload,
+                **options,
+            ) as response:
+                try:
+                    result = await response.json(content_type=None)
+                except ValueError:
+                    result = {}
+
+                if response.status != 429 and response.status < 500:
                     return result
+
+                retry_after = (result.get("parameters") or {}).get("retry_after")
+                if retry_after:
+                    # Telegram says exactly how long to wait (flood control)
+                    delay = retry_after + random.uniform(0, 1)
+                logger.warning(
+                    f"⚠️ {method} got {response.status}, attempt {attempt + 1}/{TELEGRAM_API_ATTEMPTS}"
+                )
         except asyncio.TimeoutError:
-            print(f"⚠️ Timeout attempt {attempt + 1}/2")
-            if attempt == 0:
-                await asyncio.sleep(1)  # Wait 1 sec before retry
-                continue
-            print(f"❌ Message timeout after retries")
-            return None
-        except Exception as e:
-            print(f"❌ Send error: {type(e).__name__}: {str(e)}")
-            return None
+            logger.warning(f"⚠️ {method} timeout, attempt {attempt + 1}/{TELEGRAM_API_ATTEMPTS}")
+        except aiohttp.ClientError as e:
+            logger.warning(f"⚠️ {method} error: {type(e).__name__}: {str(e)}")
+
+        if attempt + 1 < TELEGRAM_API_ATTEMPTS:
+            await asyncio.sleep(delay)
+
+    logger.error(f"❌ {method} failed after {TELEGRAM_API_ATTEMPTS} attempts")
+    return None
+
+
+async def send_message(chat_id, text, parse_mode="Markdown"):
+    """Send text message - WITH RETRY"""
+    result = await _call(
+        "sendMessage",
+        {
+            "chat_id": chat_id,
+            "text": text,
+            "parse_mode": parse_mode
+        },
+    )
+    if result is not None:
+        logger.debug(f"✅ Message sent (ok={result.get('ok')})")
+    return result
 
 async def send_photo(chat_id, photo, caption, parse_mode="Markdown", reply_markup=None):
     """Send photo - WITH RETRY"""
-    for attempt in range(2):
-        try:
-            payload = {
-                "chat_id": chat_id,
-                "photo": photo,
-                "caption": caption,
-                "parse_mode": parse_mode
-            }
-            
-            if reply_markup:
-                payload["reply_markup"] = reply_markup
-            
-            timeout = aiohttp.ClientTimeout(total=30)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(
-                    f"https://api.telegram.org/bot{BOT_TOKEN}/sendPhoto",
-                    json=payload
-                ) as response:
-                    result = await response.json()
-                    print(f"✅ Photo sent ({response.status})")
-                    return result
-        except asyncio.TimeoutError:
-            print(f"⚠️ Photo timeout attempt {attempt + 1}/2")
-            if attempt == 0:
-                await asyncio.sleep(1)
-                continue
-            print(f"❌ Photo timeout after retries")
-            return None
-        except Exception as e:
-            print(f"❌ Photo error: {type(e).__name__}: {str(e)}")
-            return None
+    payload = {
+        "chat_id": chat_id,
+        "photo": photo,
+        "caption": caption,
+        "parse_mode": parse_mode
+    }
+
+    if reply_markup:
+        payload["reply_markup"] = reply_markup
+
+    result = await _call("sendPhoto", payload)
+    if result is not None:
+        logger.debug(f"✅ Photo sent (ok={result.get('ok')})")
+    return result
 
 async def set_webhook(webhook_url):
     """Set webhook"""
-    try:
-        timeout = aiohttp.ClientTimeout(total=15)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(
-                f"https://api.telegram.org/bot{BOT_TOKEN}/setWebhook",
-                json={"url": webhook_url}
-            ) as response:
-                return await response.json()
-    except Exception as e:
-        print(f"❌ Webhook error: {type(e).__name__}")
-        return None
+    return await _call("setWebhook", {"url": webhook_url}, timeout=15)
 
 async def close_session():
-    """Dummy for compatibility"""
-    pass
-                
+    """Close the shared Bot API session (app shutdown)"""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
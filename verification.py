@@ -2,200 +2,250 @@
 UNIVERSAL Shortlink Verification System
 Works with ANY shortlink service - arolinks, gplinks, shrinkme, etc.
 GOAL: Generate shortlinks that earn you money when users click them
+
+Shortlinks are created with an async client on one pooled aiohttp
+session, so a slow provider never blocks the event loop (bot included):
+
+- the API format that worked last for SHORTLINK_URL is tried first,
+- the whole call has a deadline (SHORTLINK_DEADLINE seconds),
+- after SHORTLINK_BREAKER_FAILURES failed calls in a row the provider
+  is skipped for SHORTLINK_BREAKER_COOLDOWN seconds. Then a single call
+  tries it again; the others skip it until that call succeeds, and a
+  failure starts another cooldown.
+
+create_universal_shortlink() returns None whenever no shortlink could
+be made; callers then send the direct verification URL:
+
+    shortlink_url = await create_universal_shortlink(redirect_url) or redirect_url
 """
 
+import asyncio
+import json
+import logging
 import string
 import random
-import requests
-import logging
-from config import SHORTLINK_API, SHORTLINK_URL
+import time
+
+from config import (
+    SHORTLINK_API,
+    SHORTLINK_URL,
+    SHORTLINK_DEADLINE,
+    SHORTLINK_ATTEMPT_TIMEOUT,
+    SHORTLINK_BREAKER_FAILURES,
+    SHORTLINK_BREAKER_COOLDOWN,
+)
 
 logger = logging.getLogger(__name__)
 
+# Check all possible response field names
+_SHORTLINK_FIELDS = [
+    'shortenedUrl', 'shortened_url', 'short_url', 'shortUrl',
+    'result_url', 'url', 'link', 'shortened', 'short_link',
+    'result', 'shortlink', 'short', 'data'
+]
+
+
 def generate_verify_token(length=16):
     """Generate random verification token"""
     chars = string.ascii_letters + string.digits
     return ''.join(random.choice(chars) for _ in range(length))
 
-def create_universal_shortlink(original_url):
-    """
-    UNIVERSAL shortlink creator
-    Tries ALL common API formats until one works
-    GOAL: Create shortlink that earns you money
-    """
-    logger.info(f"🔗 Creating shortlink for: {original_url}")
-    logger.info(f"🌐 Using service: {SHORTLINK_URL}")
-    logger.info(f"🔑 API key: {SHORTLINK_API[:10]}...")
-    
-    # Prepare API endpoint
-    api_endpoint = SHORTLINK_URL
+
+def _api_endpoint(shortlink_url):
+    api_endpoint = shortlink_url
     if not api_endpoint.startswith('http'):
         api_endpoint = f"https://{api_endpoint}"
-    
+
     if not api_endpoint.endswith('/api'):
         if not api_endpoint.endswith('/'):
             api_endpoint += '/api'
         else:
             api_endpoint += 'api'
-    
-    # Try all common API formats
-    api_formats = [
+    return api_endpoint
+
+
+def _api_formats(api_key, original_url):
+    """All common API formats, in the order they are tried by default."""
+    return [
         # Format 1: GET with api & url parameters
-        {'method': 'GET', 'params': {'api': SHORTLINK_API, 'url': original_url}},
+        {'method': 'GET', 'params': {'api': api_key, 'url': original_url}},
         # Format 2: POST with api & url parameters
-        {'method': 'POST', 'data': {'api': SHORTLINK_API, 'url': original_url}},
+        {'method': 'POST', 'data': {'api': api_key, 'url': original_url}},
         # Format 3: GET with key & url parameters
-        {'method': 'GET', 'params': {'key': SHORTLINK_API, 'url': original_url}},
+        {'method': 'GET', 'params': {'key': api_key, 'url': original_url}},
         # Format 4: GET with token & link parameters
-        {'method': 'GET', 'params': {'token': SHORTLINK_API, 'link': original_url}},
+        {'method': 'GET', 'params': {'token': api_key, 'link': original_url}},
         # Format 5: JSON POST with Authorization header
-        {'method': 'POST', 'json': {'url': original_url}, 'headers': {'Authorization': f'Bearer {SHORTLINK_API}'}},
+        {'method': 'POST', 'json': {'url': original_url}, 'headers': {'Authorization': f'Bearer {api_key}'}},
         # Format 6: Form POST with api_key
-        {'method': 'POST', 'data': {'api_key': SHORTLINK_API, 'long_url': original_url}},
+        {'method': 'POST', 'data': {'api_key': api_key, 'long_url': original_url}},
         # Format 7: GET with apikey parameter
-        {'method': 'GET', 'params': {'apikey': SHORTLINK_API, 'originalUrl': original_url}},
+        {'method': 'GET', 'params': {'apikey': api_key, 'originalUrl': original_url}},
         # Format 8: Custom format for specific services
-        {'method': 'GET', 'params': {'api': SHORTLINK_API, 'url': original_url, 'alias': generate_verify_token(6)}},
+        {'method': 'GET', 'params': {'api': api_key, 'url': original_url, 'alias': generate_verify_token(6)}},
     ]
-    
-    # Try each format
-    for i, format_config in enumerate(api_formats, 1):
-        try:
-            logger.info(f"🔄 Trying API format #{i}: {format_config['method']}")
-            
-            # Make request based on format
-            if format_config['method'] == 'GET':
-                response = requests.get(
-                    api_endpoint,
-                    params=format_config.get('params'),
-                    headers=format_config.get('headers', {}),
-                    timeout=15
-                )
-            else:  # POST
-                response = requests.post(
-                    api_endpoint,
-                    data=format_config.get('data'),
-                    json=format_config.get('json'),
-                    headers=format_config.get('headers', {}),
-                    timeout=15
-                )
-            
-            logger.info(f"📊 Response Status: {response.status_code}")
-            logger.info(f"📄 Response: {response.text[:500]}")
-            
-            # Try to parse JSON response
-            if response.status_code == 200:
-                try:
-                    data = response.json()
-                    
-                    # Check all possible response field names
-                    possible_fields = [
-                        'shortenedUrl', 'shortened_url', 'short_url', 'shortUrl',
-                        'result_url', 'url', 'link', 'shortened', 'short_link',
-                        'result', 'shortlink', 'short', 'data'
-                    ]
-                    
-                    for field in possible_fields:
-                        if field in data and data[field]:
-                            shortlink = data[field]
-                            # Extract URL if it's nested in data object
-                            if isinstance(shortlink, dict) and 'url' in shortlink:
-                                shortlink = shortlink['url']
-                            # Validate it's a proper URL
-                            if isinstance(shortlink, str) and shortlink.startswith('http'):
-                                logger.info(f"✅ SUCCESS! Shortlink created: {shortlink}")
-                                return shortlink
-                    
-                    # Check if response indicates success but different format
-                    if data.get('status') == 'success' or data.get('success') == True:
-                        logger.info(f"📋 Success response but no URL found: {data}")
-                    else:
-                        logger.warning(f"⚠️ Format #{i} failed: {data}")
-                        
-                except ValueError:
-                    # Not JSON, maybe plain text response
-                    if response.text.startswith('http'):
-                        logger.info(f"✅ SUCCESS! Plain text shortlink: {response.text}")
-                        return response.text.strip()
-                        
-        except requests.exceptions.Timeout:
-            logger.warning(f"⏰ Format #{i} timed out")
-        except requests.exceptions.RequestException as e:
-            logger.warning(f"🔌 Format #{i} connection error: {e}")
-        except Exception as e:
-            logger.warning(f"❌ Format #{i} error: {e}")
-    
-    logger.error("❌ ALL API formats failed! No shortlink created.")
-    return None
 
-def test_shortlink_api():
-    """Test your shortlink API with detailed debugging"""
-    try:
-        logger.info("🧪 Testing shortlink API...")
-        # Test with a simple URL
-        test_url = "https://google.com"
-        result = create_universal_shortlink(test_url)
-        
-        if result and result.startswith('http') and result != test_url:
-            logger.info(f"✅ API TEST SUCCESS! Shortlink: {result}")
-            return True
-        else:
-            logger.error(f"❌ API TEST FAILED! Result: {result}")
-            return False
-    except Exception as e:
-        logger.error(f"❌ API test error: {e}")
-        return False
 
-def generate_monetized_verification_link(bot_username, token):
-    """
-    Generate MONETIZED verification link
-    This is where you EARN MONEY when users click
-    """
-    try:
-        # Create Telegram verification URL
-        telegram_url = f"https://t.me/{bot_username}?start=verify_{token}"
-        logger.info(f"🎯 Creating MONETIZED shortlink for verification...")
-        logger.info(f"📱 Original Telegram URL: {telegram_url}")
-        
-        # Create shortlink using your API
-        shortlink = create_universal_shortlink(telegram_url)
-        
-        if shortlink and shortlink != telegram_url:
-            logger.info(f"💰 MONETIZED SHORTLINK CREATED! You'll earn money when users click: {shortlink}")
-            return shortlink
-        else:
-            logger.error(f"❌ SHORTLINK CREATION FAILED! Using direct Telegram link (NO MONEY EARNED)")
-            logger.error(f"🔧 Check your SHORTLINK_API and SHORTLINK_URL settings!")
-            return telegram_url
-    except Exception as e:
-        logger.error(f"❌ Error creating monetized link: {e}")
-        return f"https://t.me/{bot_username}?start=verify_{token}"
-
-def extract_token_from_start(text):
-    """
-    Extract verification token from /start command
-    ✅ FIXED: Handles BOTH verify_ (leech) and video_ (video) prefixes
-    """
+def _extract_shortlink(text):
+    """Shortlink from a provider response body, or None."""
     try:
-        if not text:
-            return None
-        
-        # For leech verification - return with verify_ prefix
-        if text.startswith("verify_"):
-            return text  # Return full token with prefix
-        
-        # For video verification - return with video_ prefix  
-        elif text.startswith("video_"):
-            return text  # Return full token with prefix
-        
-        # Unknown format - return None
+        data = json.loads(text)
+    except ValueError:
+        # Not JSON, maybe plain text response
+        text = text.strip()
+        return text if text.startswith('http') else None
+
+    if not isinstance(data, dict):
         return None
-        
-    except Exception as e:
-        logger.error(f"Error extracting token: {e}")
+
+    for field in _SHORTLINK_FIELDS:
+        if field in data and data[field]:
+            shortlink = data[field]
+            # Extract URL if it's nested in data object
+            if isinstance(shortlink, dict) and 'url' in shortlink:
+                shortlink = shortlink['url']
+            # Validate it's a proper URL
+            if isinstance(shortlink, str) and shortlink.startswith('http'):
+                return shortlink
+    return None
+
+
+class ShortlinkClient:
+    """Async shortlink API client with format learning and a circuit breaker."""
+
+    def __init__(self, shortlink_url, api_key):
+        self.endpoint = _api_endpoint(shortlink_url)
+        self.api_key = api_key
+        self.preferred_format = None  # index into _api_formats that last worked
+        self.failures = 0  # consecutive failed calls
+        self.open_until = 0.0  # breaker open (provider skipped) until this monotonic time
+        self._probing = False  # half-open: one trial call after the cooldown is running
+        self.created = 0
+        self.failed = 0
+        self.skipped = 0
+        self._session = None
+
+    def _get_session(self):
+        # aiohttp is imported on the first shortlink, not at startup (~0.25s)
+        import aiohttp
+
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=20, ttl_dns_cache=300),
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def _order(self, count):
+        if self.preferred_format is None:
+            return list(range(count))
+        return [self.preferred_format] + [i for i in range(count) if i != self.preferred_format]
+
+    async def _try_format(self, fmt, timeout):
+        import aiohttp
+
+        session = self._get_session()
+        async with session.request(
+            fmt['method'],
+            self.endpoint,
+            params=fmt.get('params'),
+            data=fmt.get('data'),
+            json=fmt.get('json'),
+            headers=fmt.get('headers', {}),
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        ) as response:
+            text = await response.text()
+            if response.status != 200:
+                logger.debug(f"📊 {response.status}: {text[:200]}")
+                return None
+            return _extract_shortlink(text)
+
+    async def _create(self, original_url, deadline_at):
+        import aiohttp
+
+        formats = _api_formats(self.api_key, original_url)
+        for i in self._order(len(formats)):
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                logger.warning("⏰ Shortlink deadline reached")
+                return None
+            try:
+                shortlink = await self._try_format(
+                    formats[i], min(SHORTLINK_ATTEMPT_TIMEOUT, remaining)
+                )
+            except asyncio.TimeoutError:
+                logger.warning(f"⏰ Format #{i + 1} timed out")
+                continue
+            except aiohttp.ClientError as e:
+                logger.warning(f"🔌 Format #{i + 1} connection error: {e}")
+                continue
+            except Exception as e:
+                # e.g. a body that isn't valid text: try the next format
+                logger.warning(f"❌ Format #{i + 1} failed: {type(e).__name__}: {e}")
+                continue
+
+            if shortlink:
+                if self.preferred_format != i:
+                    logger.info(f"✅ Shortlink format #{i + 1} works for {self.endpoint}")
+                self.preferred_format = i
+                return shortlink
         return None
 
-# Backward compatibility
-def generate_verification_link(bot_username, token):
-    return generate_monetized_verification_link(bot_username, token)
-    
+    async def create(self, original_url, deadline=SHORTLINK_DEADLINE):
+        """Shortlink for original_url, or None (provider down, deadline, breaker open)."""
+        # Tripped and cooled down (half-open): one call probes the provider,
+        # the others keep skipping it until that probe succeeds
+        probe = bool(self.open_until)
+        if time.monotonic() < self.open_until or (probe and self._probing):
+            self.skipped += 1
+            return None
+
+        if probe:
+            self._probing = True
+        try:
+            shortlink = await self._create(original_url, time.monotonic() + deadline)
+        finally:
+            if probe:
+                self._probing = False
+
+        if shortlink:
+            self.created += 1
+            self.failures = 0
+            self.open_until = 0.0
+            return shortlink
+
+        self.failed += 1
+        self.failures += 1
+        if probe or self.failures >= SHORTLINK_BREAKER_FAILURES:
+            self.open_until = time.monotonic() + SHORTLINK_BREAKER_COOLDOWN
+            logger.error(
+                f"❌ Shortlink provider failing, using direct links for "
+                f"{SHORTLINK_BREAKER_COOLDOWN}s"
+            )
+        return None
+
+    def stats(self):
+        return {
+            "endpoint": self.endpoint,
+            "preferred_format": None if self.preferred_format is None else self.preferred_format + 1,
+            "breaker_open": time.monotonic() < self.open_until,
+            "created": self.created,
+            "failed": self.failed,
+            "skipped": self.skipped,
+        }
+
+
+shortlink_client = ShortlinkClient(SHORTLINK_URL, SHORTLINK_API)
+
+
+async def create_universal_shortlink(original_url):
+    """
+    UNIVERSAL shortlink creator
+    Tries ALL common API formats until one works (the last working one first)
+    GOAL: Create shortlink that earns you money
+    Returns None if no shortlink could be created in time.
+    """
+    return await shortlink_client.create(original_url)
@@ -1,22 +1,31 @@
 # verification_checker.py
 
-from datetime import datetime, timedelta
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timedelta, timezone
 
-import pytz
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
+from cache import TTLCache
 from config import (
     VERIFICATION_ON,
     VERIFICATION_FREE_LIMIT,
     VERIFICATION_RESET_HOUR,
+    QUOTA_CACHE_SIZE,
 )
 
+logger = logging.getLogger(__name__)
+
 
 def _today_reset_time():
     """
     Return today's reset time (midnight or configured hour) in UTC.
     Adjust here if you want IST explicitly.
     """
-    now = datetime.now(pytz.UTC)
+    now = datetime.now(timezone.utc)
     reset = now.replace(
         hour=int(VERIFICATION_RESET_HOUR),
         minute=0,
@@ -31,6 +40,218 @@ def _today_reset_time():
     return reset
 
 
+class QuotaCache:
+    """
+    Per-process cache in front of verif_users.
+
+    - Verified users are remembered until the next reset hour and never
+      hit MongoDB again that day.
+    - Users comfortably under the limit take free views from a local
+      counter; the extra views are written back in batches (flush).
+    - The check that could take the *last* free slot always goes to
+      MongoDB (after writing back this user's local views), so the limit
+      is enforced by the atomic update. With several processes each one
+      may count a few views locally before they are written back.
+
+    To keep that promise under concurrency, a cached count only ever
+    grows within a day (replies can arrive out of order), views being
+    written back still count locally, and no view is counted locally
+    while a MongoDB check for the same user is running.
+
+    Entries live in a bounded TTLCache ("quota" in /admin/cache-stats);
+    pending counts are kept apart so evicting an entry loses nothing.
+    """
+
+    def __init__(self, maxsize):
+        self._entries = TTLCache("quota", maxsize=maxsize, ttl=24 * 3600)
+        self._pending = {}  # user_id -> (reset_time, views not yet in MongoDB)
+        self._writing = {}  # user_id -> (reset_time, views in a bulk_write right now)
+        self._deciding = Counter()  # user_id -> MongoDB checks in flight
+        self.local_verified = 0
+        self.local_counted = 0
+        self.mongo_checks = 0
+        self.flushed_views = 0
+
+    def _unwritten(self, user_id, reset_time):
+        views = 0
+        for counts in (self._pending, self._writing):
+            reset, n = counts.get(user_id, (reset_time, 0))
+            if reset == reset_time:
+                views += n
+        return views
+
+    def check(self, user_id, reset_time, limit):
+        """Answer from memory, or None if MongoDB must decide."""
+        entry = self._entries.get(user_id)
+        if entry is None or entry["reset"] != reset_time:
+            return None
+
+        if entry["verified"]:
+            self.local_verified += 1
+            return {
+                "allowed": True,
+                "reason": "Already verified",
+                "count": entry["count"],
+                "limit": limit,
+                "need_verification": False,
+            }
+
+        if self._deciding[user_id]:
+            return None  # its result may change the count; wait for it in MongoDB
+
+        count = entry["count"] + self._unwritten(user_id, reset_time) + 1
+        if count >= limit:
+            return None  # the last free slot is taken atomically in MongoDB
+
+        _, pending = self._pending.get(user_id, (reset_time, 0))
+        self._pending[user_id] = (reset_time, pending + 1)
+        self.local_counted += 1
+        return {
+            "allowed": True,
+            "reason": "Within free daily limit",
+            "count": count,
+            "limit": limit,
+            "need_verification": False,
+        }
+
+    def begin_check(self, user_id):
+        """A MongoDB check for user_id starts: no local counting until end_check."""
+        self._deciding[user_id] += 1
+
+    def end_check(self, user_id):
+        self._deciding[user_id] -= 1
+        if not self._deciding[user_id]:
+            del self._deciding[user_id]
+
+    def remember(self, user_id, row, reset_time):
+        """Cache the document MongoDB returned for a check."""
+        self.mongo_checks += 1
+        count = int(row.get("count", 0))
+        verified = bool(row.get("verified"))
+
+        entry = self._entries.get(user_id)
+        if entry is not None and entry["reset"] == reset_time:
+            # An older reply may arrive last: never go back within a day
+            count = max(count, entry["count"])
+            verified = verified or entry["verified"]
+
+        next_reset = reset_time + timedelta(days=1)
+        ttl = (next_reset - datetime.now(timezone.utc)).total_seconds()
+        self._entries.set(
+            user_id,
+            {"reset": reset_time, "verified": verified, "count": count},
+            ttl=max(ttl, 1),
+        )
+
+    def invalidate(self, user_id):
+        self._entries.pop(str(user_id))
+
+    def clear(self):
+        self._entries.clear()
+
+    def reset(self):
+        """Forget everything, pending views included (tests)."""
+        self._entries.clear()
+        self._pending.clear()
+        self._writing.clear()
+        self._deciding.clear()
+
+    def _flush_ops(self, pending):
+        return [
+            UpdateOne(
+                # A reset since then makes these views irrelevant: match nothing
+                {"user_id": user_id, "last_reset": reset_time},
+                {"$inc": {"count": n}},
+            )
+            for user_id, (reset_time, n) in pending.items()
+        ]
+
+    async def _write(self, db, pending):
+        """
+        bulk_write `pending`; returns the part that was not written.
+        Views stay visible to check() (as _writing) until the write ends.
+        """
+        self._writing.update(pending)
+        try:
+            # Not restored if cancelled: the server may apply the write anyway
+            await db.verif_users.bulk_write(self._flush_ops(pending), ordered=False)
+            failed = {}
+        except BulkWriteError as e:
+            # Unordered: only the listed ops failed, the others were applied
+            users = list(pending)
+            failed = {
+                users[err["index"]]: pending[users[err["index"]]]
+                for err in e.details.get("writeErrors", [])
+            }
+        finally:
+            for user_id in pending:
+                self._writing.pop(user_id, None)
+
+        for user_id, (reset_time, n) in pending.items():
+            if user_id in failed:
+                continue
+            self.flushed_views += n
+            entry = self._entries.get(user_id)
+            if entry is not None and entry["reset"] == reset_time:
+                # Now part of the stored count
+                entry["count"] += n
+        return failed
+
+    async def flush_user(self, db, user_id):
+        """Write back one user's local views before MongoDB decides for them."""
+        entry = self._pending.pop(user_id, None)
+        if entry is None:
+            return
+        try:
+            failed = await self._write(db, {user_id: entry})
+        except Exception as e:
+            failed = {user_id: entry}
+            logger.error(f"❌ Quota flush failed for user {user_id}: {e}")
+        # Kept for the next flush; this check decides without them
+        self._restore(failed)
+
+    async def flush(self, db):
+        """Write back every user's local views in one bulk_write."""
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, {}
+        try:
+            failed = await self._write(db, pending)
+        except Exception as e:
+            failed = pending
+            logger.error(f"❌ Quota flush failed ({len(pending)} users): {e}")
+        else:
+            if failed:
+                logger.error(f"❌ Quota flush: {len(failed)} of {len(pending)} users not written")
+        self._restore(failed)
+
+    def _restore(self, pending):
+        for user_id, (reset_time, n) in pending.items():
+            _, newer = self._pending.get(user_id, (reset_time, 0))
+            self._pending[user_id] = (reset_time, n + newer)
+
+    async def flush_forever(self, db, interval):
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush(db)
+
+    def stats(self):
+        answered = self.local_verified + self.local_counted
+        checks = answered + self.mongo_checks
+        return {
+            "local_verified": self.local_verified,
+            "local_counted": self.local_counted,
+            "mongo_checks": self.mongo_checks,
+            "local_rate": round(answered / checks, 4) if checks else 0.0,
+            "pending_users": len(self._pending),
+            "flushed_views": self.flushed_views,
+        }
+
+
+quota_cache = QuotaCache(QUOTA_CACHE_SIZE)
+
+
 def is_verification_enabled() -> bool:
     """
     Global toggle from config.
@@ -55,6 +276,10 @@ async def check_user_access(user_id: str, db):
     - If user verified for today -> allowed.
     - If count < free_limit -> increment count, allowed.
     - Else -> blocked, need verification.
+
+    The reset, the verified check and the increment are a single atomic
+    find_one_and_update, so concurrent checks can't both take the last
+    free slot.
     """
     if not VERIFICATION_ON:
         return {
@@ -65,7 +290,6 @@ async def check_user_access(user_id: str, db):
             "need_verification": False,
         }
 
-    now = datetime.now(pytz.UTC)
     reset_time = _today_reset_time()
     limit = int(VERIFICATION_FREE_LIMIT)
 
@@ -75,59 +299,27 @@ async def check_user_access(user_id: str, db):
     #   count: int,
     #   verified: bool,
     #   last_reset: datetime,
-    #   last_verified: datetime
+    #   last_verified: datetime,
+    #   last_grant: ObjectId   # id of the last check that was allowed a free view
     # }
-    row = await db.verif_users.find_one({"user_id": str(user_id)})
-
-    if not row:
-        # First time user today -> create doc with count=1
-        doc = {
-            "user_id": str(user_id),
-            "count": 1,
-            "verified": False,
-            "last_reset": reset_time,
-            "last_verified": None,
-        }
-        await db.verif_users.insert_one(doc)
-        return {
-            "allowed": True,
-            "reason": "First visit today",
-            "count": 1,
-            "limit": limit,
-            "need_verification": False,
-        }
+    uid = str(user_id)
+    cached = quota_cache.check(uid, reset_time, limit)
+    if cached is not None:
+        return cached
+
+    quota_cache.begin_check(uid)
+    try:
+        await quota_cache.flush_user(db, uid)
+        grant = ObjectId()
+        row = await _check_and_count(db, uid, reset_time, limit, grant)
+        quota_cache.remember(uid, row, reset_time)
+    finally:
+        quota_cache.end_check(uid)
 
-    # Existing user
-    last_reset = row.get("last_reset")
     count = int(row.get("count", 0))
-    verified = bool(row.get("verified", False))
-
-    # NORMALIZE last_reset to timezone-aware UTC to avoid naive/aware compare error
-    if isinstance(last_reset, datetime):
-        if last_reset.tzinfo is None:
-            # Old records saved as naive -> treat as UTC
-            last_reset = last_reset.replace(tzinfo=pytz.UTC)
-    else:
-        # If somehow not a datetime, force reset
-        last_reset = None
-
-    # Reset if last_reset is before today's reset_time
-    if not last_reset or last_reset < reset_time:
-        count = 0
-        verified = False
-        await db.verif_users.update_one(
-            {"user_id": str(user_id)},
-            {
-                "$set": {
-                    "count": 0,
-                    "verified": False,
-                    "last_reset": reset_time,
-                }
-            },
-        )
 
     # If already verified for today, always allow
-    if verified:
+    if row.get("verified"):
         return {
             "allowed": True,
             "reason": "Already verified",
@@ -136,16 +328,11 @@ async def check_user_access(user_id: str, db):
             "need_verification": False,
         }
 
-    # Free quota path
-    if count < limit:
-        count += 1
-        await db.verif_users.update_one(
-            {"user_id": str(user_id)},
-            {"$set": {"count": count}},
-        )
+    # Free quota path: our grant id is on the document only if we took a slot
+    if row.get("last_grant") == grant:
         return {
             "allowed": True,
-            "reason": "Within free daily limit",
+            "reason": "First visit today" if count == 1 else "Within free daily limit",
             "count": count,
             "limit": limit,
             "need_verification": False,
@@ -161,12 +348,66 @@ async def check_user_access(user_id: str, db):
     }
 
 
+def _quota_pipeline(reset_time, limit, grant):
+    """
+    Update pipeline for one access check, applied atomically by MongoDB:
+    reset count/verified if last_reset is before today's reset (or not a
+    date), then take a free slot unless verified or at the limit.
+    """
+    stale = {
+        "$or": [
+            {"$ne": [{"$type": "$last_reset"}, "date"]},
+            {"$lt": ["$last_reset", reset_time]},
+        ]
+    }
+    return [
+        {
+            "$set": {
+                "count": {"$cond": [stale, 0, {"$ifNull": ["$count", 0]}]},
+                "verified": {"$cond": [stale, False, {"$ifNull": ["$verified", False]}]},
+                "last_reset": {"$cond": [stale, reset_time, "$last_reset"]},
+                "last_verified": {"$ifNull": ["$last_verified", None]},
+            }
+        },
+        {
+            "$set": {
+                "_take": {
+                    "$and": [{"$ne": ["$verified", True]}, {"$lt": ["$count", limit]}]
+                }
+            }
+        },
+        {
+            "$set": {
+                "count": {"$cond": ["$_take", {"$add": ["$count", 1]}, "$count"]},
+                "last_grant": {"$cond": ["$_take", grant, "$last_grant"]},
+            }
+        },
+        {"$unset": "_take"},
+    ]
+
+
+async def _check_and_count(db, user_id, reset_time, limit, grant):
+    """One find_one_and_update round trip; returns the document after the check."""
+    for attempt in range(2):
+        try:
+            return await db.verif_users.find_one_and_update(
+                {"user_id": user_id},
+                _quota_pipeline(reset_time, limit, grant),
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # Two first-ever checks raced to insert; the loser retries as an update
+            if attempt:
+                raise
+
+
 async def mark_user_verified(user_id: str, db):
     """
     Mark user as verified for today.
     Call this after the user successfully completes the shortlink flow.
     """
-    now = datetime.now(pytz.UTC)
+    now = datetime.now(timezone.utc)
     reset_time = _today_reset_time()
 
     await db.verif_users.update_one(
@@ -180,6 +421,8 @@ async def mark_user_verified(user_id: str, db):
         },
         upsert=True,
     )
+    # Next check reads the verified row and caches it until the next reset
+    quota_cache.invalidate(user_id)
 
 
 async def reset_all_user_limits(db):
@@ -188,6 +431,7 @@ async def reset_all_user_limits(db):
     In most cases _today_reset_time + per-user logic is enough.
     """
     reset_time = _today_reset_time()
+    quota_cache.clear()
     await db.verif_users.update_many(
         {},
         {
@@ -0,0 +1,125 @@
+# view_counter.py
+
+"""
+Write-behind view counter.
+
+Views are counted in memory per movie id and written to db.movies in a
+single unordered bulk_write, either every VIEW_FLUSH_SECONDS or as soon
+as VIEW_FLUSH_THRESHOLD distinct movies are pending. The app flushes
+once more on shutdown.
+
+The same flush adds the views to hourly buckets in db.view_buckets
+({movie_id, hour, views}) which feed the trending scores.
+
+    from view_counter import view_counter
+
+    view_counter.record(movie["_id"])
+"""
+
+import asyncio
+import logging
+from collections import Counter
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from config import VIEW_FLUSH_THRESHOLD
+from trending import trending, current_hour
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter:
+    def __init__(self, threshold=500):
+        self.threshold = threshold
+        self.flushed_views = 0
+        self.flushes = 0
+        self._pending = Counter()
+        self._pending_hours = Counter()  # (movie_id, hour) -> views
+        self._full = asyncio.Event()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def record(self, movie_id, n=1):
+        """Count `n` views for a movie; never touches the database."""
+        self._pending[movie_id] += n
+        self._pending_hours[(movie_id, current_hour())] += n
+        trending.record(movie_id, n)
+        if len(self._pending) >= self.threshold:
+            self._full.set()
+
+    def pending_hours(self):
+        """{(movie_id, hour): views} recorded but not yet in view_buckets."""
+        return dict(self._pending_hours)
+
+    async def flush(self, db):
+        """Write every pending increment in one bulk_write."""
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, Counter()
+        hours, self._pending_hours = self._pending_hours, Counter()
+        self._full.clear()
+        ops = [
+            UpdateOne({"_id": movie_id}, {"$inc": {"views": n}})
+            for movie_id, n in pending.items()
+        ]
+        bucket_ops = [
+            UpdateOne(
+                {"movie_id": movie_id, "hour": hour},
+                {"$inc": {"views": n}},
+                upsert=True,
+            )
+            for (movie_id, hour), n in hours.items()
+        ]
+        failed = Counter()
+        try:
+            # Not restored if cancelled: the server may apply the write anyway
+            await db.movies.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            # Unordered: only the listed ops failed, the others were applied.
+            # Their hourly buckets are still written below (trending is approximate).
+            movie_ids = list(pending)
+            for err in e.details.get("writeErrors", []):
+                movie_id = movie_ids[err["index"]]
+                failed[movie_id] = pending[movie_id]
+            self._pending.update(failed)
+            logger.error(
+                f"❌ View counter flush: {len(failed)} of {len(ops)} movies not written"
+            )
+        except Exception as e:
+            # Keep the counts for the next attempt rather than losing them
+            self._pending.update(pending)
+            self._pending_hours.update(hours)
+            logger.error(f"❌ View counter flush failed ({len(ops)} movies): {e}")
+            return
+
+        try:
+            await db.view_buckets.bulk_write(bucket_ops, ordered=False)
+        except Exception as e:
+            # Trending is approximate; don't double count movies.views by retrying
+            logger.error(f"❌ View bucket flush failed ({len(bucket_ops)} buckets): {e}")
+
+        self.flushes += 1
+        self.flushed_views += sum(pending.values()) - sum(failed.values())
+
+    async def flush_forever(self, db, interval):
+        """Flush every `interval` seconds, or early when the buffer is full."""
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush(db)
+
+    def stats(self):
+        return {
+            "pending_movies": len(self._pending),
+            "pending_views": sum(self._pending.values()),
+            "flushes": self.flushes,
+            "flushed_views": self.flushed_views,
+        }
+
+
+view_counter = ViewCounter(threshold=VIEW_FLUSH_THRESHOLD)